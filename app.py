@@ -1,24 +1,145 @@
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, g, render_template_string, jsonify, request
+import csv
+import io
 import json
-import random
+import math
+import os
+import threading
+import time
 from datetime import datetime
 
+import numpy as np
+
+from backend.alerts import RuleEngine, default_rules
+from backend.archive import TelemetryArchive
+from backend.auth import SessionStore
+from backend.cache import ResponseCache
+from backend.device_import import import_devices
+from backend.eventlog import EventLog
+from backend.export import EXTENSIONS as EXPORT_EXTENSIONS, MIMETYPES as EXPORT_MIMETYPES
+from backend.export import archive_batches, iter_export, resolve_format as resolve_export_format, store_batches
+from backend.health import HealthEngine
+from backend.ingest import IngestQueue, readings_to_columns, split_valid, validate_reading
+from backend.metrics import REGISTRY as metrics
+from backend.pipeline import Pipeline
+from backend.poller import Poller, start_in_thread
+from backend.profiler import profile_for
+from backend.registry import DeviceRegistry
+from backend.serialization import FastJSONProvider, json_column
+from backend.reports import iter_report_csv
+from backend.simulator import METRICS, FleetSimulator
+from backend.stream import Broadcaster, Producer, diff_records
+from backend.timeseries import TelemetryStore
+
 app = Flask(__name__)
 
+REQUEST_SECONDS = metrics.histogram(
+    'bms_http_request_duration_seconds', 'Time to produce a response, by route', ('route', 'method'))
+REQUESTS = metrics.counter('bms_http_requests_total', 'Responses sent, by route and status', ('route', 'method', 'status'))
+JSON_BYTES = metrics.counter('bms_json_serialized_bytes_total', 'Bytes of JSON serialized')
+
+class MeteredJSONProvider(FastJSONProvider):
+    """Fast JSON encoding that also counts the bytes it produces"""
+
+    def dumps_bytes(self, obj):
+        body = super().dumps_bytes(obj)
+        JSON_BYTES.inc(len(body))
+        return body
+
+app.json = MeteredJSONProvider(app)
+# orjson is used when installed; BMS_JSON_ENCODER=stdlib forces the stdlib encoder
+if os.environ.get('BMS_JSON_ENCODER') == 'stdlib':
+    app.json.use_orjson = False
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed to the first byte, not to the end of the stream
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.labels(route, request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+    return response
+
+# Pipeline workers are spawned, and spawn re-imports this file as __mp_main__
+# when the app runs as `python app.py`. Workers need none of the app's state,
+# so setup with side effects (opening the archive, hashing, starting workers)
+# is skipped there.
+SPAWNED_WORKER = __name__ == '__mp_main__'
+
+# Reading history for Telemetry & Charts and health scoring
+telemetry_store = TelemetryStore()
+health_engine = HealthEngine(window=None, window_seconds=900)
+rule_engine = RuleEngine(default_rules())
+
+# Optional on-disk archive for long-range reports
+ARCHIVE_DIR = os.environ.get('BMS_ARCHIVE_DIR')
+ARCHIVE_RETENTION_DAYS = float(os.environ.get('BMS_ARCHIVE_RETENTION_DAYS', 90))
+telemetry_archive = TelemetryArchive(ARCHIVE_DIR) if ARCHIVE_DIR and not SPAWNED_WORKER else None
+
+# Alert transitions, logins and device changes for the System Logs page
+event_log = EventLog(max_events=int(os.environ.get('BMS_EVENT_LOG_MAX_EVENTS', 2_000_000)),
+                     max_age=float(os.environ.get('BMS_EVENT_LOG_RETENTION_DAYS', 7)) * 86400)
+
+# Serialized responses for the polled endpoints, validated by data version
+response_cache = ResponseCache()
+response_cache.register('devices', lambda: registry.version)
+response_cache.register('alerts', lambda: (pipeline or rule_engine).version)
+response_cache.register('logs', lambda: event_log.version)
+response_cache.register('summary', lambda: f'{registry.version}.{(pipeline or rule_engine).version}')
+
 # Sample data
-devices = [
+registry = DeviceRegistry([
     {"id": 1, "name": "Main HVAC Unit 1", "status": "online", "temperature": 22.5, "co2": 400, "location": "Building A - Floor 1"},
     {"id": 2, "name": "Main HVAC Unit 2", "status": "online", "temperature": 23.1, "co2": 420, "location": "Building A - Floor 2"},
     {"id": 3, "name": "Conference Room AC", "status": "online", "temperature": 21.8, "co2": 380, "location": "Building B - Conference"},
     {"id": 4, "name": "Server Room Cooling", "status": "online", "temperature": 19.2, "co2": 350, "location": "Building B - Server Room"},
     {"id": 5, "name": "Lobby Climate Control", "status": "online", "temperature": 24.1, "co2": 450, "location": "Building A - Lobby"},
-]
+])
 
+# PBKDF2 hashes of the demo passwords shown on the login page
 users = {
-    "admin@voltas.com": {"password": "admin123", "role": "admin"},
-    "operator@voltas.com": {"password": "operator123", "role": "operator"},
-    "guest@voltas.com": {"password": "guest123", "role": "guest"}
+    "admin@voltas.com": {"role": "admin",
+                         "password_hash": "pbkdf2_sha256$600000$lIRgF+7gqwerDZgBoRruZQ$5eRHRyIGtZKHrnyfEzNnPLGxpOaHYiqzIR45pNsshLs"},
+    "operator@voltas.com": {"role": "operator",
+                            "password_hash": "pbkdf2_sha256$600000$kKi+SY7RDnSbO8DwsF3bcA$UW7+s227byZivNF0V1teYS09rKgY5xINE/JXDEvFYGc"},
+    "guest@voltas.com": {"role": "guest",
+                         "password_hash": "pbkdf2_sha256$600000$ICOQDgDmLCaoCLg8gOEMgg$Ds6pzIkp3JDvwUCcLOFKFnd4zBO9rEDQasiMIC6mlFY"},
 }
+sessions = None if SPAWNED_WORKER else SessionStore(users, ttl=float(os.environ.get('BMS_SESSION_TTL', 12 * 3600)))
+
+# Everything under /api/ needs a session token except logging in
+PUBLIC_ENDPOINTS = {'login'}
+
+# EventSource and browser downloads cannot set headers, so only these routes
+# accept ?token=; anywhere else it would leak into access logs and Referers
+QUERY_TOKEN_ENDPOINTS = {'stream_devices', 'export_report'}
+
+def request_token():
+    """Bearer token from the Authorization header, or ?token= for EventSource and downloads"""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    if request.endpoint in QUERY_TOKEN_ENDPOINTS:
+        return request.args.get('token')
+    return None
+
+@app.before_request
+def require_session():
+    if not request.path.startswith('/api/') or request.endpoint in PUBLIC_ENDPOINTS:
+        return None
+    session = sessions.authenticate(request_token())
+    if session is None:
+        response = jsonify({'error': 'Authentication required'})
+        response.status_code = 401
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response
+    g.user = session
+    return None
 
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -126,22 +247,26 @@ HTML_TEMPLATE = '''
                 <h1 class="page-title">Dashboard Overview</h1>
                 <div class="stats-grid">
                     <div class="stat-card">
-                        <div class="stat-number" style="color: #3b82f6;">5</div>
+                        <div class="stat-number" id="statDevices" style="color: #3b82f6;">–</div>
                         <div class="stat-label">Total Devices</div>
                     </div>
                     <div class="stat-card">
-                        <div class="stat-number" style="color: #10b981;">5</div>
+                        <div class="stat-number" id="statOnline" style="color: #10b981;">–</div>
                         <div class="stat-label">Online Devices</div>
                     </div>
                     <div class="stat-card">
-                        <div class="stat-number" style="color: #ef4444;">0</div>
+                        <div class="stat-number" id="statAlerts" style="color: #ef4444;">–</div>
                         <div class="stat-label">Active Alerts</div>
                     </div>
                     <div class="stat-card">
-                        <div class="stat-number" style="color: #f59e0b;">22.5°C</div>
+                        <div class="stat-number" id="statTemperature" style="color: #f59e0b;">–</div>
                         <div class="stat-label">Avg Temperature</div>
                     </div>
                 </div>
+                <table class="table" style="margin-bottom: 2rem;">
+                    <thead><tr><th>Building</th><th>Devices</th><th>Online</th><th>Active Alerts</th><th>Avg Temperature</th></tr></thead>
+                    <tbody id="buildingSummary"></tbody>
+                </table>
                 <div class="devices-grid" id="homeDevicesList"></div>
             </div>
 
@@ -169,7 +294,11 @@ HTML_TEMPLATE = '''
             <!-- Logs Page -->
             <div id="logs" class="page-section">
                 <h1 class="page-title">System Logs</h1>
+                <div class="form-group">
+                    <input type="search" id="logSearch" placeholder="Search events..." oninput="loadLogs()">
+                </div>
                 <div id="logsList"></div>
+                <button class="btn" id="logsMore" onclick="loadLogs(logsCursor)" style="display: none;">Load more</button>
             </div>
 
             <!-- Reports Page -->
@@ -178,7 +307,9 @@ HTML_TEMPLATE = '''
                 <div style="background: white; padding: 2rem; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
                     <h3>📊 Generate Reports</h3>
                     <p>Export device data, telemetry reports, and system analytics.</p>
-                    <button class="btn" style="margin-top: 1rem;">📄 Export CSV</button>
+                    <button class="btn" style="margin-top: 1rem;" onclick="exportReport('csv')">📄 Export CSV</button>
+                    <button class="btn" style="margin-top: 1rem; margin-left: 1rem;" onclick="exportReport('parquet')">🗃️ Export Parquet</button>
+                    <button class="btn" style="margin-top: 1rem; margin-left: 1rem;" onclick="exportReport('npz')">🔢 Export NPZ</button>
                     <button class="btn" style="margin-top: 1rem; margin-left: 1rem;">📋 Export PDF</button>
                 </div>
             </div>
@@ -196,6 +327,22 @@ HTML_TEMPLATE = '''
 
     <script>
         let currentUser = null;
+        let authToken = null;
+
+        function apiFetch(url, options = {}) {
+            const headers = Object.assign({}, options.headers, {'Authorization': 'Bearer ' + authToken});
+            return fetch(url, Object.assign({}, options, {headers})).then(res => {
+                if (res.status === 401) {
+                    logout();
+                    throw new Error('Session expired');
+                }
+                return res;
+            });
+        }
+
+        function withToken(url) {
+            return url + (url.includes('?') ? '&' : '?') + 'token=' + encodeURIComponent(authToken);
+        }
 
         function login() {
             const email = document.getElementById('email').value;
@@ -210,10 +357,12 @@ HTML_TEMPLATE = '''
             .then(data => {
                 if (data.success) {
                     currentUser = data;
+                    authToken = data.token;
                     document.getElementById('loginSection').style.display = 'none';
                     document.getElementById('dashboard').style.display = 'block';
                     document.getElementById('userRole').textContent = data.role.charAt(0).toUpperCase() + data.role.slice(1);
-                    loadDevices();
+                    connectDeviceStream();
+                    loadSummary();
                     loadAlerts();
                     loadLogs();
                 } else {
@@ -223,9 +372,17 @@ HTML_TEMPLATE = '''
         }
 
         function logout() {
+            if (authToken) {
+                fetch('/api/logout', {method: 'POST', headers: {'Authorization': 'Bearer ' + authToken}});
+            }
             document.getElementById('loginSection').style.display = 'block';
             document.getElementById('dashboard').style.display = 'none';
             currentUser = null;
+            authToken = null;
+            if (deviceStream) {
+                deviceStream.close();
+                deviceStream = null;
+            }
         }
 
         function showPage(pageId) {
@@ -235,124 +392,627 @@ HTML_TEMPLATE = '''
             event.target.classList.add('active');
         }
 
-        function loadDevices() {
-            fetch('/api/devices')
-            .then(res => res.json())
-            .then(devices => {
-                const html = devices.map(device => `
-                    <div class="device-card">
-                        <div class="device-header">
-                            <div class="device-name">${device.name}</div>
-                            <div class="device-status status-${device.status}">${device.status.toUpperCase()}</div>
+        let deviceStream = null;
+
+        function renderDevices(devices) {
+            const html = devices.map(device => `
+                <div class="device-card" data-device-id="${escapeHtml(device.id)}">
+                    <div class="device-header">
+                        <div class="device-name" data-field="name">${escapeHtml(device.name)}</div>
+                        <div class="device-status status-${escapeHtml(device.status)}" data-field="status">${escapeHtml(String(device.status).toUpperCase())}</div>
+                    </div>
+                    <p style="color: #6b7280; margin-bottom: 1rem;" data-field="location">${escapeHtml(device.location || 'Location not specified')}</p>
+                    <div class="device-metrics">
+                        <div class="metric">
+                            <div class="metric-value" data-field="temperature">${escapeHtml(device.temperature)}°C</div>
+                            <div class="metric-label">Temperature</div>
+                        </div>
+                        <div class="metric">
+                            <div class="metric-value" data-field="co2">${escapeHtml(device.co2)}</div>
+                            <div class="metric-label">CO2 (ppm)</div>
                         </div>
-                        <p style="color: #6b7280; margin-bottom: 1rem;">${device.location || 'Location not specified'}</p>
-                        <div class="device-metrics">
-                            <div class="metric">
-                                <div class="metric-value">${device.temperature}°C</div>
-                                <div class="metric-label">Temperature</div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-value">${device.co2}</div>
-                                <div class="metric-label">CO2 (ppm)</div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-value">${Math.round(Math.random() * 40 + 40)}%</div>
-                                <div class="metric-label">Humidity</div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-value">${(Math.random() * 5 + 2).toFixed(1)}kW</div>
-                                <div class="metric-label">Power</div>
-                            </div>
+                        <div class="metric">
+                            <div class="metric-value" data-field="humidity">${escapeHtml(device.humidity)}%</div>
+                            <div class="metric-label">Humidity</div>
+                        </div>
+                        <div class="metric">
+                            <div class="metric-value" data-field="power_kw">${escapeHtml(device.power_kw)}kW</div>
+                            <div class="metric-label">Power</div>
                         </div>
                     </div>
+                </div>
+            `).join('');
+            document.getElementById('devicesList').innerHTML = html;
+            document.getElementById('homeDevicesList').innerHTML = html;
+        }
+
+        function applyDeviceDeltas(deltas) {
+            deltas.forEach(delta => {
+                const cards = document.querySelectorAll(`.device-card[data-device-id="${delta.id}"]`);
+                if (!cards.length) {
+                    loadDevices();  // new device, fetch the full list once
+                    return;
+                }
+                cards.forEach(card => {
+                    Object.keys(delta).forEach(field => {
+                        const el = card.querySelector(`[data-field="${field}"]`);
+                        if (!el) return;
+                        if (field === 'status') {
+                            el.className = `device-status status-${delta.status}`;
+                            el.textContent = delta.status.toUpperCase();
+                        } else if (field === 'temperature') {
+                            el.textContent = `${delta.temperature}°C`;
+                        } else if (field === 'humidity') {
+                            el.textContent = `${delta.humidity}%`;
+                        } else if (field === 'power_kw') {
+                            el.textContent = `${delta.power_kw}kW`;
+                        } else {
+                            el.textContent = delta[field];
+                        }
+                    });
+                });
+            });
+        }
+
+        function loadDevices() {
+            apiFetch('/api/devices')
+            .then(res => res.json())
+            .then(renderDevices);
+        }
+
+        function connectDeviceStream() {
+            if (!window.EventSource) {
+                loadDevices();
+                return;
+            }
+            deviceStream = new EventSource(withToken('/api/stream'));
+            deviceStream.addEventListener('snapshot', e => renderDevices(JSON.parse(e.data)));
+            deviceStream.addEventListener('delta', e => applyDeviceDeltas(JSON.parse(e.data)));
+        }
+
+        function formatTemperature(value) {
+            return value === null ? '–' : `${value.toFixed(1)}°C`;
+        }
+
+        function loadSummary() {
+            apiFetch('/api/summary')
+            .then(res => res.json())
+            .then(summary => {
+                document.getElementById('statDevices').textContent = summary.total.devices;
+                document.getElementById('statOnline').textContent = summary.total.online;
+                document.getElementById('statAlerts').textContent = summary.total.alerts;
+                document.getElementById('statTemperature').textContent = formatTemperature(summary.total.avg_temperature);
+                document.getElementById('buildingSummary').innerHTML = summary.buildings.map(b => `
+                    <tr>
+                        <td>${escapeHtml(b.building || 'Unassigned')}</td>
+                        <td>${b.devices}</td>
+                        <td>${b.online}</td>
+                        <td>${b.alerts}</td>
+                        <td>${formatTemperature(b.avg_temperature)}</td>
+                    </tr>
                 `).join('');
-                document.getElementById('devicesList').innerHTML = html;
-                document.getElementById('homeDevicesList').innerHTML = html;
             });
         }
 
         function loadAlerts() {
-            const alerts = [
-                { id: 1, device: 'HVAC Unit 1', message: 'Temperature threshold exceeded', time: new Date().toLocaleString() },
-                { id: 2, device: 'Server Room AC', message: 'CO2 levels high', time: new Date().toLocaleString() }
-            ];
-            
-            const html = alerts.map(alert => `
-                <div class="alert-item">
-                    <h4>${alert.device}</h4>
-                    <p>${alert.message}</p>
-                    <small>🕒 ${alert.time}</small>
-                </div>
-            `).join('');
-            document.getElementById('alertsList').innerHTML = html;
+            apiFetch('/api/alerts')
+            .then(res => res.json())
+            .then(alerts => {
+                const html = alerts.map(alert => `
+                    <div class="alert-item">
+                        <h4>${escapeHtml(alert.device)}</h4>
+                        <p>${escapeHtml(alert.message)} (${escapeHtml(alert.value)})</p>
+                        <small>🕒 ${new Date(alert.since * 1000).toLocaleString()} · ${escapeHtml(alert.severity)}</small>
+                    </div>
+                `).join('');
+                document.getElementById('alertsList').innerHTML = html || '<p>No active alerts</p>';
+            });
         }
 
-        function loadLogs() {
-            const logs = [
-                { time: new Date().toLocaleString(), event: 'Device Connected', device: 'HVAC Unit 1' },
-                { time: new Date().toLocaleString(), event: 'Alert Triggered', device: 'Server Room AC' },
-                { time: new Date().toLocaleString(), event: 'User Login', device: 'System' }
-            ];
-            
-            const html = logs.map(log => `
-                <div class="log-item">
-                    <strong>${log.event}</strong> - ${log.device}
-                    <br><small>🕒 ${log.time}</small>
-                </div>
-            `).join('');
-            document.getElementById('logsList').innerHTML = html;
+        let logsCursor = null;
+
+        function escapeHtml(text) {
+            return String(text).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'})[c]);
         }
 
-        // Auto-refresh
+        function loadLogs(cursor) {
+            const params = new URLSearchParams({limit: 50});
+            const query = document.getElementById('logSearch').value.trim();
+            if (query) params.set('q', query);
+            if (cursor) params.set('cursor', cursor);
+            apiFetch('/api/logs?' + params)
+            .then(res => {
+                logsCursor = res.headers.get('X-Next-Cursor');
+                return res.json();
+            })
+            .then(logs => {
+                const html = logs.map(log => `
+                    <div class="log-item">
+                        <strong>${escapeHtml(log.event_type.replace(/_/g, ' '))}</strong> - ${escapeHtml(log.device)}: ${escapeHtml(log.message)}
+                        <br><small>🕒 ${new Date(log.ts * 1000).toLocaleString()}</small>
+                    </div>
+                `).join('');
+                const list = document.getElementById('logsList');
+                if (cursor) {
+                    list.insertAdjacentHTML('beforeend', html);
+                } else {
+                    list.innerHTML = html || '<p>No events</p>';
+                }
+                document.getElementById('logsMore').style.display = logsCursor ? 'inline-block' : 'none';
+            });
+        }
+
+        function exportReport(format) {
+            window.location = withToken('/api/reports/export?format=' + format);
+        }
+
+        // Fallback polling for browsers without EventSource
         setInterval(() => {
-            if (currentUser) {
+            if (currentUser && !window.EventSource) {
                 loadDevices();
             }
         }, 30000);
+
+        // Overview cards; unchanged summaries come back as 304s
+        setInterval(() => {
+            if (currentUser) {
+                loadSummary();
+            }
+        }, 10000);
     </script>
 </body>
 </html>
 '''
 
+def cached_json(topic, build):
+    """Serve build()'s JSON from the response cache, honouring If-None-Match
+
+    build returns the payload, or (payload, headers) for extra headers.
+    """
+    key = request.path + '?' + '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)) if k != 'token')
+    if request.if_none_match.contains(response_cache.etag(topic, key)):
+        response = Response(status=304)
+        response.set_etag(response_cache.etag(topic, key))
+        return response
+
+    def serialize():
+        result = build()
+        payload, headers = result if isinstance(result, tuple) else (result, {})
+        return app.json.dumps_bytes(payload), headers
+
+    etag, body, headers = response_cache.get(topic, key, serialize)
+    response = Response(body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/')
 def index():
     return render_template_string(HTML_TEMPLATE)
 
 @app.route('/api/login', methods=['POST'])
 def login():
-    data = request.json
-    email = data.get('email')
-    password = data.get('password')
-    
-    if email in users and users[email]['password'] == password:
-        return jsonify({'success': True, 'role': users[email]['role']})
-    return jsonify({'success': False})
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    session = sessions.login(data.get('email'), data.get('password'))
+    if session is None:
+        event_log.append('login_failed', 'System', f"Failed sign-in for {data.get('email')}")
+        return jsonify({'success': False})
+    event_log.append('user_login', 'System', f"{session['email']} signed in")
+    return jsonify(dict(session, success=True))
+
+@app.route('/api/logout', methods=['POST'])
+def logout():
+    sessions.revoke(request_token())
+    event_log.append('user_logout', 'System', f"{g.user['email']} signed out")
+    return jsonify({'success': True})
+
+def _apply_latest(key, latest):
+    """Refresh a registered device from its latest metric values"""
+    if not key.isdigit():
+        return
+    fields = {m: v for m, v in latest.items() if m in METRICS and not math.isnan(v)}
+    if 'co2_ppm' in fields:
+        fields['co2'] = int(fields.pop('co2_ppm'))
+    registry.update(int(key), status='online', **fields)
+
+def log_alert_transitions(transitions):
+    events = []
+    for alert in transitions:
+        device_id = alert['device_id']
+        device = registry.get(int(device_id)) if str(device_id).isdigit() else None
+        name = device['name'] if device else str(device_id)
+        if alert['state'] == 'open':
+            events.append(('alert_opened', name, f"{alert['message']} ({alert['value']:.1f}, {alert['severity']})"))
+        else:
+            events.append(('alert_resolved', name, f"Resolved: {alert.get('message', alert['rule_id'])}"))
+    if events:
+        event_log.extend(events)
+
+def publish_device_deltas():
+    deltas = diff_records(published_devices, registry.to_dicts())
+    if deltas:
+        device_stream.publish('delta', deltas)
+
+def storage_key(device_id):
+    """Key record_readings stores device_id's history under: its registry id when known"""
+    record_id = registry.resolve(device_id)
+    return str(record_id) if record_id is not None else str(device_id)
+
+def record_readings(columns, simulated=False):
+    """Feed a columnar batch into history, health, alerts and the device list
+
+    columns holds "device_id", "ts", the METRICS arrays and "status". Device
+    ids may be registry ids or device_ids; readings for known devices also
+    refresh that device's latest values. Devices that receive real
+    (not simulated) readings are no longer simulated. In pipeline mode
+    health, alerts and latest values are computed by the worker processes
+    instead.
+    """
+    keys = []
+    for device_id in columns['device_id']:
+        record_id = registry.resolve(device_id)
+        keys.append(str(record_id) if record_id is not None else str(device_id))
+        if record_id is not None and not simulated and record_id not in real_source_ids:
+            real_source_ids.add(record_id)
+    columns = dict(columns, device_id=keys)
+    ts = np.asarray(columns['ts'], dtype=np.float64)
+
+    unique, inverse = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    groups = np.split(order, np.cumsum(np.bincount(inverse, minlength=len(unique)))[:-1])
+    for key, rows in zip(unique.tolist(), groups):
+        telemetry_store.extend(key, ts[rows], {m: columns[m][rows] for m in METRICS})
+        if pipeline is None:
+            health_engine.update_many([key] * len(rows), columns['status'][rows].tolist(), ts[rows].tolist())
+            last = rows[np.argmax(ts[rows])]
+            _apply_latest(key, {m: columns[m][last].item() for m in METRICS})
+
+    if pipeline is not None:
+        pipeline.submit(columns)
+    else:
+        log_alert_transitions(rule_engine.evaluate(columns))
+    if telemetry_archive is not None:
+        telemetry_archive.append(ts, keys, {m: columns[m] for m in METRICS})
+        telemetry_archive.drop_before(time.time() - ARCHIVE_RETENTION_DAYS * 86400)
+    if pipeline is None:
+        publish_device_deltas()
+
+def pipeline_update(devices, transitions):
+    for key, latest in devices.items():
+        _apply_latest(key, latest)
+    log_alert_transitions(transitions)
+    publish_device_deltas()
+
+# Optional multi-process mode: health, alerts and latest values are sharded
+# across BMS_PIPELINE_WORKERS processes and the web process reads their aggregates
+PIPELINE_WORKERS = int(os.environ.get('BMS_PIPELINE_WORKERS', 0))
+pipeline = Pipeline(PIPELINE_WORKERS, on_update=pipeline_update) if PIPELINE_WORKERS > 0 and not SPAWNED_WORKER else None
+
+_simulator = None
+# Devices with a real data source (polled, imported or sent readings); never simulated
+real_source_ids = set()
+
+def simulate_tick():
+    """Generate one round of simulated readings for the devices without a real source"""
+    global _simulator
+    keys = [str(device_id) for device_id in registry.ids() if device_id not in real_source_ids]
+    if not keys:
+        return
+    if _simulator is None or _simulator.device_ids != keys:
+        _simulator = FleetSimulator(keys)
+    readings = {metric: values[:, 0] for metric, values in _simulator.step(1).items()}
+    record_readings(dict(readings, device_id=keys, ts=np.full(len(keys), time.time())), simulated=True)
+
+def ingest_batch(readings):
+    record_readings(readings_to_columns(readings))
+
+ingest_queue = IngestQueue(ingest_batch)
+
+# Optional field polling: a device CSV with ip/port/unit_id/register/interval columns
+POLL_DEVICES = os.environ.get('BMS_POLL_DEVICES')
+_poller = None
+
+def start_poller():
+    """Register the polled devices and poll them into the ingest queue"""
+    global _poller
+    result = import_devices(POLL_DEVICES, existing=registry.to_dicts())
+    for config in result['accepted']:
+        registry.add(dict(config, status='offline', location=config.get('location', '')))
+    configs = [d for d in registry.to_dicts() if d.get('ip') and d.get('port')]
+    real_source_ids.update(d['id'] for d in configs if d.get('protocol', 'Modbus') == 'Modbus')
+    ingest_queue.start()
+    _poller = Poller(configs, ingest_queue.offer)
+    start_in_thread(_poller)
+
+# A single background producer does the simulation work for every client
+SIMULATION_INTERVAL = float(os.environ.get('SIMULATION_INTERVAL', 5))
+published_devices = {}
+device_stream = Broadcaster(registry.to_dicts)
+_producer = None
+_producer_lock = threading.Lock()
+
+def ensure_producer():
+    global _producer
+    if _producer is None:
+        with _producer_lock:
+            if _producer is None:
+                _producer = Producer(simulate_tick, SIMULATION_INTERVAL)
+                _producer.start()
+                if POLL_DEVICES and _poller is None:
+                    start_poller()
+
+metrics.gauge('bms_ingest_queue_depth', 'Readings waiting in the ingest queue', lambda: ingest_queue.depth)
+metrics.gauge('bms_ingest_processed_readings_total', 'Readings processed by the ingest worker',
+              lambda: ingest_queue.processed, kind='counter')
+metrics.gauge('bms_poller_dropped_readings_total', 'Polled readings refused by a full ingest queue',
+              lambda: _poller.stats['dropped'] if _poller is not None else 0, kind='counter')
+metrics.gauge('bms_stream_subscribers', 'Connected /api/stream clients', device_stream.subscriber_count)
+metrics.gauge('bms_response_cache_hits_total', 'Response cache hits', lambda: response_cache.hits, kind='counter')
+metrics.gauge('bms_response_cache_misses_total', 'Response cache misses', lambda: response_cache.misses, kind='counter')
+metrics.gauge('bms_response_cache_hit_ratio', 'Response cache hit ratio', response_cache.hit_ratio)
+metrics.gauge('bms_devices', 'Registered devices', lambda: len(registry))
+metrics.gauge('bms_sessions', 'Active login sessions', lambda: len(sessions))
+metrics.gauge('bms_auth_cache_hits_total', 'Tokens verified from the cache', lambda: sessions.hits, kind='counter')
+metrics.gauge('bms_auth_cache_misses_total', 'Tokens verified with the KDF', lambda: sessions.misses, kind='counter')
+if pipeline is not None:
+    metrics.gauge('bms_pipeline_backlog_readings', 'Readings submitted to the pipeline but not yet aggregated',
+                  lambda: pipeline.submitted - pipeline.processed)
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Sampling profiler, only reachable when BMS_PROFILER=1
+PROFILER_ENABLED = os.environ.get('BMS_PROFILER') == '1'
+
+@app.route('/debug/profile')
+def get_profile():
+    if not PROFILER_ENABLED:
+        return jsonify({'error': 'Profiler disabled; set BMS_PROFILER=1'}), 404
+    seconds = min(request.args.get('seconds', 10, type=float), 60)
+    interval = max(request.args.get('interval', 0.005, type=float), 0.001)
+    return Response(profile_for(seconds, interval), mimetype='text/plain')
 
 @app.route('/api/devices')
 def get_devices():
-    # Simulate real-time data
-    for device in devices:
-        device['temperature'] = round(20 + random.uniform(0, 5), 1)
-        device['co2'] = random.randint(350, 500)
-        device['status'] = 'online'  # All devices online for demo
-    return jsonify(devices)
+    ensure_producer()
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+
+    def build():
+        page, next_cursor = registry.query(
+            status=request.args.get('status'),
+            protocol=request.args.get('protocol'),
+            building=request.args.get('building'),
+            limit=limit,
+            cursor=request.args.get('cursor', type=int),
+        )
+        return page, {'X-Next-Cursor': str(next_cursor)} if next_cursor is not None else {}
+    return cached_json('devices', build)
+
+@app.route('/api/devices/import', methods=['POST'])
+def import_devices_csv():
+    upload = request.files.get('file')
+    source = upload.stream if upload else io.BytesIO(request.get_data())
+    try:
+        result = import_devices(source, existing=registry.to_dicts())
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Unreadable CSV: {e}'}), 400
+    for config in result['accepted']:
+        record = registry.add(dict(config, status='offline', location=config.get('location', '')))
+        real_source_ids.add(record.id)
+    event_log.extend(('device_added', config.get('name', ''), f"Imported by {g.user['email']}")
+                     for config in result['accepted'])
+    return jsonify({
+        'accepted': len(result['accepted']),
+        'rejected': result['rejected'],
+        'total_rows': result['total_rows'],
+    })
+
+@app.route('/api/stream')
+def stream_devices():
+    ensure_producer()
+    return Response(device_stream.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def is_registered(device_id):
+    return registry.resolve(device_id) is not None
+
+def _queue_full_response(body):
+    response = jsonify(dict(body, error='Ingestion queue full'))
+    response.status_code = 429
+    response.headers['Retry-After'] = str(ingest_queue.retry_after())
+    return response
+
+@app.route('/api/telemetry/batch', methods=['POST'])
+def ingest_telemetry_batch():
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('readings')
+    if not isinstance(data, list):
+        return jsonify({'error': 'Expected a JSON array of readings or {"readings": [...]}'}), 400
+    readings, rejected = split_valid(data, is_known=is_registered)
+    ingest_queue.start()
+    if not ingest_queue.offer(readings):
+        return _queue_full_response({'accepted': 0})
+    return jsonify({'accepted': len(readings), 'rejected': rejected}), 202
+
+@app.route('/api/telemetry/stream', methods=['POST'])
+def ingest_telemetry_ndjson():
+    """Newline-delimited JSON readings, queued in chunks as they arrive"""
+    ingest_queue.start()
+    chunk, rejected, accepted = [], [], 0
+    for line_number, line in enumerate(request.stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            reading = json.loads(line)
+        except ValueError:
+            rejected.append({'index': line_number, 'reason': 'invalid JSON'})
+            continue
+        reason = validate_reading(reading, is_registered)
+        if reason:
+            rejected.append({'index': line_number, 'reason': reason})
+            continue
+        chunk.append(reading)
+        if len(chunk) >= ingest_queue.batch_size:
+            if not ingest_queue.offer(chunk):
+                return _queue_full_response({'accepted': accepted, 'stopped_at_line': line_number})
+            accepted += len(chunk)
+            chunk = []
+    if not ingest_queue.offer(chunk):
+        return _queue_full_response({'accepted': accepted})
+    accepted += len(chunk)
+    return jsonify({'accepted': accepted, 'rejected': rejected}), 202
+
+@app.route('/api/devices/health')
+def get_devices_health():
+    return jsonify((pipeline or health_engine).scores())
+
+def _parse_time(value, default):
+    """Parse an epoch-seconds or ISO-8601 query parameter"""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/api/telemetry/<device_id>')
+def get_telemetry(device_id):
+    try:
+        end = _parse_time(request.args.get('to'), time.time())
+        start = _parse_time(request.args.get('from'), end - 3600)
+        result = telemetry_store.query(storage_key(device_id), start, end, request.args.get('resolution', 'auto'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if result is None:
+        return jsonify({'error': 'Device not found'}), 404
+
+    resolution = result.pop('resolution')
+    timestamps = result.pop('ts').tolist()
+    # Values are stored as float32, so json_column also trims the representation noise
+    if resolution == 'raw':
+        columns = {metric: json_column(values) for metric, values in result.items()}
+    else:
+        columns = {metric: {k: json_column(v) for k, v in stats.items()} for metric, stats in result.items()}
+    body = {'device_id': device_id, 'resolution': resolution, 'from': start, 'to': end}
+
+    if request.args.get('shape') == 'columns':
+        # Compact shape for large ranges: one array per field instead of one object per reading
+        body['ts'] = timestamps
+        body.update(columns)
+        return jsonify(body)
+
+    points = [{'timestamp': ts} for ts in timestamps]
+    for metric, values in columns.items():
+        if resolution == 'raw':
+            for point, value in zip(points, values):
+                point[metric] = value
+        else:
+            stats = [dict(zip(values, row)) for row in zip(*values.values())]
+            for point, value in zip(points, stats):
+                point[metric] = value
+    body['points'] = points
+    return jsonify(body)
+
+@app.route('/api/reports/export')
+def export_report():
+    try:
+        end = _parse_time(request.args.get('to'), time.time())
+        start = _parse_time(request.args.get('from'), end - 86400)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    compress = request.args.get('gzip') in ('1', 'true')
+    devices_param = request.args.get('devices')
+    device_ids = [storage_key(d) for d in devices_param.split(',')] if devices_param else None
+    stamp = datetime.fromtimestamp(end).strftime('%Y%m%d_%H%M')
+
+    export_format = request.args.get('format', 'csv')
+    if export_format != 'csv':
+        try:
+            written = resolve_export_format(export_format)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if telemetry_archive is not None:
+            batches = archive_batches(telemetry_archive, start, end, device_ids)
+        else:
+            batches = store_batches(telemetry_store, start, end, device_ids)
+        metadata = {'title': 'Device Report', 'start': datetime.fromtimestamp(start).isoformat(),
+                    'end': datetime.fromtimestamp(end).isoformat()}
+        filename = f"device_report_{stamp}.{EXPORT_EXTENSIONS[written]}"
+        # X-Export-Format tells clients when arrow/parquet fell back to npz
+        return Response(iter_export(batches, written, metadata), mimetype=EXPORT_MIMETYPES[written],
+                        headers={'Content-Disposition': f'attachment; filename={filename}',
+                                 'X-Export-Format': written})
+
+    if telemetry_archive is not None:
+        rows = telemetry_archive.iter_rows(start, end, device_ids)
+    else:
+        rows = telemetry_store.iter_rows(start, end, device_ids)
+    chunks = iter_report_csv(rows, datetime.fromtimestamp(start), datetime.fromtimestamp(end), compress=compress)
+    filename = f"device_report_{stamp}.csv"
+    if compress:
+        filename += '.gz'
+    return Response(chunks, mimetype='application/gzip' if compress else 'text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/api/alerts')
 def get_alerts():
-    alerts = [
-        {'id': 1, 'device': 'HVAC Unit 1', 'message': 'Temperature threshold exceeded', 'severity': 'high'},
-        {'id': 2, 'device': 'Server Room AC', 'message': 'CO2 levels elevated', 'severity': 'medium'}
-    ]
-    return jsonify(alerts)
+    ensure_producer()
+
+    def build():
+        alerts = []
+        for alert in (pipeline or rule_engine).active():
+            record_id = registry.resolve(alert['device_id'])
+            device = registry.get(record_id) if record_id is not None else None
+            alerts.append(dict(alert, device=device['name'] if device else alert['device_id']))
+        return alerts
+    return cached_json('alerts', build)
+
+@app.route('/api/summary')
+def get_summary():
+    ensure_producer()
+
+    def build():
+        summary = registry.summary()
+        alerts = {}
+        for alert in (pipeline or rule_engine).active():
+            device_id = str(alert['device_id'])
+            building = registry.building_of(int(device_id)) if device_id.isdigit() else None
+            alerts[building] = alerts.get(building, 0) + 1
+        summary['total']['alerts'] = sum(alerts.values())
+        for group in summary['buildings']:
+            group['alerts'] = alerts.get(group['building'], 0)
+        return summary
+    return cached_json('summary', build)
 
 @app.route('/api/logs')
 def get_logs():
-    logs = [
-        {'timestamp': datetime.now().isoformat(), 'event': 'Device Connected', 'device': 'HVAC Unit 1'},
-        {'timestamp': datetime.now().isoformat(), 'event': 'Alert Triggered', 'device': 'Server Room AC'},
-        {'timestamp': datetime.now().isoformat(), 'event': 'User Login', 'device': 'System'}
-    ]
-    return jsonify(logs)
+    try:
+        start = _parse_time(request.args.get('from'), None)
+        end = _parse_time(request.args.get('to'), None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Ages out old events first, so a cached page cannot outlive them
+    event_log.expire()
+
+    def build():
+        page, next_cursor = event_log.query(
+            start=start,
+            end=end,
+            device=request.args.get('device'),
+            event_type=request.args.get('event_type'),
+            text=request.args.get('q'),
+            limit=max(1, min(request.args.get('limit', 100, type=int), 1000)),
+            cursor=request.args.get('cursor', type=int),
+        )
+        return page, {'X-Next-Cursor': str(next_cursor)} if next_cursor is not None else {}
+    return cached_json('logs', build)
 
 if __name__ == '__main__':
     import os
@@ -0,0 +1,310 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.utils import CO2_FAULT, CO2_WARNING, TEMP_FAULT, TEMP_WARNING
+
+CHUNK_ELEMENTS = 4_000_000  # rows x rules evaluated per NumPy pass
+
+class Rule:
+    """A compiled-once alert condition on one metric
+
+    kind="threshold" compares the metric itself, kind="rate" compares its
+    rate of change per second. The alert opens when the value crosses
+    threshold (op ">" or "<") and has stayed across it for for_seconds; it
+    resolves only once the value is back past clear (hysteresis).
+    """
+
+    __slots__ = ("rule_id", "metric", "op", "threshold", "clear", "for_seconds",
+                 "kind", "severity", "message", "device_ids")
+
+    def __init__(self, rule_id: str, metric: str, op: str, threshold: float,
+                 clear: Optional[float] = None, for_seconds: float = 0.0, kind: str = "threshold",
+                 severity: str = "medium", message: Optional[str] = None,
+                 device_ids: Optional[Iterable[str]] = None):
+        if op not in (">", "<"):
+            raise ValueError(f"Unsupported operator: {op}")
+        if kind not in ("threshold", "rate"):
+            raise ValueError(f"Unsupported rule kind: {kind}")
+        clear = threshold if clear is None else clear
+        if (op == ">" and clear > threshold) or (op == "<" and clear < threshold):
+            raise ValueError(f"Rule {rule_id}: clear level must be on the safe side of the threshold")
+        self.rule_id = rule_id
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.clear = clear
+        self.for_seconds = for_seconds
+        self.kind = kind
+        self.severity = severity
+        self.message = message or f"{metric} {op} {threshold}"
+        self.device_ids = set(device_ids) if device_ids is not None else None
+
+    @property
+    def source(self) -> tuple:
+        return (self.kind, self.metric)
+
+def default_rules() -> List[Rule]:
+    """Alert rules matching the simulator's status thresholds"""
+    return [
+        Rule("temp_warning", "temperature", ">", TEMP_WARNING, clear=TEMP_WARNING - 1, severity="medium",
+             message=f"Temperature above {TEMP_WARNING:g}°C"),
+        Rule("temp_fault", "temperature", ">", TEMP_FAULT, clear=TEMP_FAULT - 1, severity="high",
+             message=f"Temperature above {TEMP_FAULT:g}°C"),
+        Rule("co2_warning", "co2_ppm", ">", CO2_WARNING, clear=CO2_WARNING - 50, severity="medium",
+             message=f"CO2 levels above {CO2_WARNING:g} ppm"),
+        Rule("co2_fault", "co2_ppm", ">", CO2_FAULT, clear=CO2_FAULT - 50, severity="high",
+             message=f"CO2 levels above {CO2_FAULT:g} ppm"),
+    ]
+
+class _RuleGroup:
+    """Rules sharing a source column, stored as parallel arrays"""
+
+    def __init__(self, source: tuple, rules: List[Rule]):
+        self.source = source
+        self.rules = rules
+        sign = np.array([1.0 if r.op == ">" else -1.0 for r in rules])
+        self.sign = sign
+        # Comparisons are done on sign * value so every rule reads as ">"
+        self.trigger = sign * np.array([r.threshold for r in rules], dtype=np.float64)
+        self.clear = sign * np.array([r.clear for r in rules], dtype=np.float64)
+        self.for_seconds = np.array([r.for_seconds for r in rules], dtype=np.float64)
+        self.sustained = bool((self.for_seconds > 0).any())
+        # Cheap per-row prefilter: a value can only breach some rule in the
+        # group if it is above the lowest ">" or below the highest "<" threshold
+        self.hot_above = min((r.threshold for r in rules if r.op == ">"), default=np.inf)
+        self.hot_below = max((r.threshold for r in rules if r.op == "<"), default=-np.inf)
+        self.scoped = [(j, r.device_ids) for j, r in enumerate(rules) if r.device_ids is not None]
+        # Per (device, rule) state, grown as devices appear
+        self.active = np.zeros((0, len(rules)), dtype=bool)
+        self.run_start = np.zeros((0, len(rules)), dtype=np.float64)
+
+    def grow(self, n_devices: int):
+        extra = n_devices - len(self.active)
+        if extra > 0:
+            self.active = np.vstack([self.active, np.zeros((extra, len(self.rules)), dtype=bool)])
+            self.run_start = np.vstack([self.run_start, np.full((extra, len(self.rules)), np.nan)])
+
+def _segment_bounds(codes: np.ndarray):
+    """Boolean masks for the first and last row of each device run"""
+    n = len(codes)
+    seg_start = np.ones(n, dtype=bool)
+    seg_end = np.ones(n, dtype=bool)
+    if n > 1:
+        change = codes[1:] != codes[:-1]
+        seg_start[1:] = change
+        seg_end[:-1] = change
+    return seg_start, seg_end
+
+def _ffill_index(mask: np.ndarray) -> np.ndarray:
+    """Row index of the most recent True in mask, per column"""
+    rows = np.arange(mask.shape[0])[:, None]
+    return np.maximum.accumulate(np.where(mask, rows, 0), axis=0)
+
+class RuleEngine:
+    """Evaluates alert rules over columnar batches of readings
+
+    Rules are grouped by source column (a metric or its rate of change) and
+    each group is evaluated as a rows x rules NumPy matrix. Open/resolve
+    transitions come from a vectorized hysteresis state machine over
+    readings sorted by (device, time), with per-device state carried
+    between batches, so only state changes are emitted (no duplicates).
+    Devices that are quiet in a batch and have no open or pending alert
+    are skipped before the matrix step.
+    """
+
+    def __init__(self, rules: Sequence[Rule] = (), chunk_elements: int = CHUNK_ELEMENTS):
+        self.chunk_elements = chunk_elements
+        self._lock = threading.Lock()
+        self._device_codes: Dict[str, int] = {}
+        self._device_ids: List[str] = []
+        self._last_value: Dict[str, np.ndarray] = {}
+        self._last_ts: Dict[str, np.ndarray] = {}
+        self._open: Dict[tuple, dict] = {}
+        self._next_alert_id = 1
+        self.version = 0  # advanced whenever the set of open alerts changes
+        self.set_rules(rules)
+
+    def set_rules(self, rules: Sequence[Rule]):
+        """Compile rules into groups; resets alert state"""
+        by_source: Dict[tuple, List[Rule]] = {}
+        for rule in rules:
+            by_source.setdefault(rule.source, []).append(rule)
+        with self._lock:
+            self.rules = list(rules)
+            self._groups = [_RuleGroup(source, group) for source, group in by_source.items()]
+            for group in self._groups:
+                group.grow(len(self._device_ids))
+            self._open.clear()
+            self.version += 1
+
+    def _codes_for(self, device_ids) -> np.ndarray:
+        unique, inverse = np.unique(np.asarray(device_ids, dtype=str), return_inverse=True)
+        codes = np.empty(len(unique), dtype=np.int64)
+        for i, device_id in enumerate(unique.tolist()):
+            code = self._device_codes.get(device_id)
+            if code is None:
+                code = self._device_codes[device_id] = len(self._device_ids)
+                self._device_ids.append(device_id)
+            codes[i] = code
+        n_devices = len(self._device_ids)
+        for group in self._groups:
+            group.grow(n_devices)
+        for metric in list(self._last_value):
+            self._grow_rate_state(metric, n_devices)
+        return codes[inverse]
+
+    def _grow_rate_state(self, metric: str, n_devices: int):
+        values = self._last_value.get(metric)
+        have = 0 if values is None else len(values)
+        if have < n_devices:
+            pad = np.full(n_devices - have, np.nan)
+            self._last_value[metric] = pad if values is None else np.concatenate([values, pad])
+            self._last_ts[metric] = pad.copy() if values is None else np.concatenate([self._last_ts[metric], pad])
+
+    def evaluate(self, batch: Dict[str, Sequence]) -> List[dict]:
+        """Evaluate a columnar batch and return open/resolve transitions
+
+        batch holds "device_id" and "ts" columns plus one column per metric;
+        missing readings may be NaN.
+        """
+        with self._lock:
+            if not len(batch["ts"]):
+                return []
+            codes = self._codes_for(batch["device_id"])
+            ts = np.asarray(batch["ts"], dtype=np.float64)
+            order = np.lexsort((ts, codes))
+            codes, ts = codes[order], ts[order]
+            columns = {}
+            for group in self._groups:
+                metric = group.source[1]
+                if metric in batch and metric not in columns:
+                    columns[metric] = np.asarray(batch[metric], dtype=np.float64)[order]
+
+            max_rules = max((len(g.rules) for g in self._groups), default=1)
+            chunk = max(1024, self.chunk_elements // max_rules)
+            transitions = []
+            for lo in range(0, len(ts), chunk):
+                hi = lo + chunk
+                sources = self._sources(codes[lo:hi], ts[lo:hi], {m: v[lo:hi] for m, v in columns.items()})
+                for group in self._groups:
+                    values = sources.get(group.source)
+                    if values is not None:
+                        transitions.extend(self._evaluate_group(group, codes[lo:hi], ts[lo:hi], values))
+            if transitions:
+                self.version += 1
+            return transitions
+
+    def _sources(self, codes: np.ndarray, ts: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[tuple, np.ndarray]:
+        """Source columns for this chunk, deriving per-second rates where needed"""
+        sources = {}
+        rate_metrics = {g.source[1] for g in self._groups if g.source[0] == "rate"}
+        for metric, values in columns.items():
+            sources[("threshold", metric)] = values
+            if metric not in rate_metrics:
+                continue
+            self._grow_rate_state(metric, len(self._device_ids))
+            valid = ~np.isnan(values)
+            v, t, c = values[valid], ts[valid], codes[valid]
+            rate = np.full(len(values), np.nan)
+            if len(v):
+                seg_start, seg_end = _segment_bounds(c)
+                prev_v = np.empty_like(v)
+                prev_t = np.empty_like(t)
+                prev_v[1:], prev_t[1:] = v[:-1], t[:-1]
+                prev_v[seg_start] = self._last_value[metric][c[seg_start]]
+                prev_t[seg_start] = self._last_ts[metric][c[seg_start]]
+                dt = t - prev_t
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    rate[valid] = np.where(dt > 0, (v - prev_v) / dt, np.nan)
+                self._last_value[metric][c[seg_end]] = v[seg_end]
+                self._last_ts[metric][c[seg_end]] = t[seg_end]
+            sources[("rate", metric)] = rate
+        return sources
+
+    def _evaluate_group(self, group: _RuleGroup, codes: np.ndarray, ts: np.ndarray,
+                        values: np.ndarray) -> List[dict]:
+        valid = ~np.isnan(values)
+        # Only devices with a reading past some trigger, or with an open or
+        # pending alert, can transition; everything else is skipped here
+        hot = valid & ((values > group.hot_above) | (values < group.hot_below))
+        needed = np.zeros(len(self._device_ids), dtype=bool)
+        needed[codes[hot]] = True
+        needed |= group.active.any(axis=1) | ~np.isnan(group.run_start).all(axis=1)
+        rows = valid & needed[codes]
+        if not rows.any():
+            return []
+        codes, ts, values = codes[rows], ts[rows], values[rows]
+        seg_start, seg_end = _segment_bounds(codes)
+
+        signed = values[:, None] * group.sign[None, :]
+        breach = signed > group.trigger[None, :]
+        clear = signed <= group.clear[None, :]
+        for j, device_ids in group.scoped:
+            in_scope = np.isin(codes, [self._device_codes[d] for d in device_ids if d in self._device_codes])
+            breach[:, j] &= in_scope
+            clear[:, j] |= ~in_scope
+
+        prior_run = group.run_start[codes[seg_start]]
+        if group.sustained:
+            prev = np.empty_like(breach)
+            prev[1:] = breach[:-1]
+            prev[seg_start] = ~np.isnan(prior_run)
+            new_run = breach & ~prev
+            start_val = np.where(new_run, ts[:, None], np.nan)
+            continuing = breach[seg_start] & prev[seg_start]
+            start_val[seg_start] = np.where(continuing, prior_run, start_val[seg_start])
+            mark = new_run | ~breach
+            mark[seg_start] = True
+            run_at = np.take_along_axis(start_val, _ffill_index(mark), axis=0)
+            run_at[~breach] = np.nan
+            triggered = breach & (ts[:, None] - run_at >= group.for_seconds[None, :])
+        else:
+            run_at = np.where(breach, ts[:, None], np.nan)
+            triggered = breach
+
+        prior_active = group.active[codes[seg_start]]
+        event = triggered | clear
+        event[seg_start] = True
+        event_value = triggered.copy()
+        first_triggered, first_clear = triggered[seg_start], clear[seg_start]
+        event_value[seg_start] = np.where(~first_triggered & ~first_clear, prior_active, first_triggered)
+        state = np.take_along_axis(event_value, _ffill_index(event), axis=0)
+
+        prev_state = np.empty_like(state)
+        prev_state[1:] = state[:-1]
+        prev_state[seg_start] = prior_active
+
+        last = codes[seg_end]
+        group.active[last] = state[seg_end]
+        group.run_start[last] = run_at[seg_end]
+
+        transitions = []
+        for i, j in zip(*np.nonzero(state != prev_state)):
+            transitions.append(self._transition(group.rules[j], self._device_ids[codes[i]],
+                                                bool(state[i, j]), float(ts[i]), float(values[i])))
+        return transitions
+
+    def _transition(self, rule: Rule, device_id: str, opened: bool, ts: float, value: float) -> dict:
+        key = (device_id, rule.rule_id)
+        if opened:
+            alert = {
+                "id": self._next_alert_id,
+                "rule_id": rule.rule_id,
+                "device_id": device_id,
+                "message": rule.message,
+                "severity": rule.severity,
+                "since": ts,
+                "value": value,
+            }
+            self._next_alert_id += 1
+            self._open[key] = alert
+            return dict(alert, state="open", ts=ts)
+        alert = self._open.pop(key, None) or {"rule_id": rule.rule_id, "device_id": device_id}
+        return dict(alert, state="resolved", ts=ts, value=value)
+
+    def active(self) -> List[dict]:
+        """Currently open alerts, oldest first"""
+        with self._lock:
+            return sorted((dict(a) for a in self._open.values()), key=lambda a: a["since"])
@@ -0,0 +1,283 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from backend.export import archive_batches
+from backend.simulator import METRICS
+
+# Fixed-width columns, one file per column per segment
+COLUMNS = {
+    "ts": np.dtype("<i8"),      # epoch milliseconds
+    "device": np.dtype("<u4"),  # code into catalog["devices"]
+    "metric": np.dtype("<u2"),  # code into catalog["metrics"]
+    "value": np.dtype("<f4"),
+}
+SEGMENT_ROWS = 1 << 22
+INDEX_STRIDE = 4096
+
+def _write_json(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+class _Segment:
+    """One directory of column files plus a sparse time index"""
+
+    def __init__(self, path: str, stride: int):
+        self.path = path
+        self.stride = stride
+        self.meta_path = os.path.join(path, "meta.json")
+        self.sealed = os.path.exists(self.meta_path)
+        self._maps = None
+        if self.sealed:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.rows, self.min_ts, self.max_ts, self.sorted = meta["rows"], meta["min_ts"], meta["max_ts"], meta["sorted"]
+            self.index = np.fromfile(os.path.join(path, "index.i8"), dtype=COLUMNS["ts"])
+        else:
+            self._recover()
+
+    def column_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.col")
+
+    def _recover(self):
+        """Reopen an unsealed segment, truncating any torn trailing row"""
+        os.makedirs(self.path, exist_ok=True)
+        sizes = []
+        for name, dtype in COLUMNS.items():
+            path = self.column_path(name)
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        self.rows = min(sizes)
+        for name, dtype in COLUMNS.items():
+            with open(self.column_path(name), "ab") as f:
+                f.truncate(self.rows * dtype.itemsize)
+        self.files = {name: open(self.column_path(name), "ab") for name in COLUMNS}
+        ts = np.fromfile(self.column_path("ts"), dtype=COLUMNS["ts"]) if self.rows else np.empty(0, dtype=np.int64)
+        self.index = list(ts[::self.stride])
+        self.sorted = bool(np.all(np.diff(ts) >= 0))
+        self.min_ts = int(ts.min()) if self.rows else None
+        self.max_ts = int(ts.max()) if self.rows else None
+        self.last_ts = int(ts[-1]) if self.rows else None
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        ts = columns["ts"]
+        n = len(ts)
+        if self.last_ts is not None and ts[0] < self.last_ts:
+            self.sorted = False
+        if n > 1 and self.sorted and not np.all(ts[1:] >= ts[:-1]):
+            self.sorted = False
+        for name, dtype in COLUMNS.items():
+            self.files[name].write(columns[name].astype(dtype, copy=False).tobytes())
+        # Sparse index: timestamp of every stride-th row
+        first = -self.rows % self.stride
+        self.index.extend(ts[first::self.stride].tolist())
+        self.rows += n
+        self.last_ts = int(ts[-1])
+        self.min_ts = int(ts.min()) if self.min_ts is None else min(self.min_ts, int(ts.min()))
+        self.max_ts = int(ts.max()) if self.max_ts is None else max(self.max_ts, int(ts.max()))
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def seal(self):
+        for f in self.files.values():
+            f.close()
+        np.asarray(self.index, dtype=COLUMNS["ts"]).tofile(os.path.join(self.path, "index.i8"))
+        self.index = np.asarray(self.index, dtype=COLUMNS["ts"])
+        _write_json(self.meta_path, {"rows": self.rows, "min_ts": self.min_ts, "max_ts": self.max_ts,
+                                     "sorted": self.sorted})
+        self.sealed = True
+
+    def maps(self, rows: int) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of the first rows of every column"""
+        if self.sealed and self._maps is not None:
+            return self._maps
+        maps = {name: np.memmap(self.column_path(name), dtype=dtype, mode="r", shape=(rows,))
+                for name, dtype in COLUMNS.items()}
+        if self.sealed:
+            self._maps = maps
+        return maps
+
+    def window(self, start_ms: int, end_ms: int, rows: int, index: np.ndarray, maps: Dict[str, np.ndarray]) -> slice:
+        """Row slice covering [start_ms, end_ms], touching only the needed pages"""
+        if not self.sorted:
+            return slice(0, rows)
+        # The sparse index narrows the search to whole stride-sized blocks
+        lo_block = max(int(np.searchsorted(index, start_ms, side="left")) - 1, 0)
+        hi_block = int(np.searchsorted(index, end_ms, side="right"))
+        lo = lo_block * self.stride
+        hi = min(hi_block * self.stride, rows)
+        ts = maps["ts"][lo:hi]
+        return slice(lo + int(np.searchsorted(ts, start_ms, side="left")),
+                     lo + int(np.searchsorted(ts, end_ms, side="right")))
+
+class TelemetryArchive:
+    """Append-only, segment-based columnar telemetry archive on local disk
+
+    Readings are stored in long form (ts, device, metric, value) as
+    fixed-width column files. A segment is sealed once it holds
+    segment_rows rows, at which point its sparse time index and metadata
+    are written. Reads memory-map the column files, and a range query uses
+    segment min/max times and the sparse index so it only touches the pages
+    holding the requested slice. Scans yield NumPy views into the maps
+    without copying.
+    """
+
+    def __init__(self, root: str, segment_rows: int = SEGMENT_ROWS, index_stride: int = INDEX_STRIDE):
+        self.root = root
+        self.segment_rows = segment_rows
+        self.index_stride = index_stride
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._catalog_path = os.path.join(root, "catalog.json")
+        catalog = {"devices": [], "metrics": []}
+        if os.path.exists(self._catalog_path):
+            with open(self._catalog_path) as f:
+                catalog = json.load(f)
+        self.devices: List[str] = catalog["devices"]
+        self.metrics: List[str] = catalog["metrics"]
+        self._device_codes = {d: i for i, d in enumerate(self.devices)}
+        self._metric_codes = {m: i for i, m in enumerate(self.metrics)}
+        names = sorted(n for n in os.listdir(root) if n.startswith("seg-"))
+        self._segments = [_Segment(os.path.join(root, n), index_stride) for n in names]
+        self._active = self._segments[-1] if self._segments and not self._segments[-1].sealed else None
+        # A crash between writing a segment's last row and sealing it leaves it full but unsealed
+        if self._active is not None and self._active.rows >= segment_rows:
+            self._active.seal()
+            self._active = None
+
+    def _codes(self, names: Sequence[str], codes: Dict[str, int], table: List[str]) -> np.ndarray:
+        unique, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+        added = False
+        mapped = np.empty(len(unique), dtype=np.int64)
+        for i, name in enumerate(unique.tolist()):
+            if name not in codes:
+                codes[name] = len(table)
+                table.append(name)
+                added = True
+            mapped[i] = codes[name]
+        if added:
+            _write_json(self._catalog_path, {"devices": self.devices, "metrics": self.metrics})
+        return mapped[inverse]
+
+    def append(self, ts: Sequence[float], device_ids: Sequence[str], columns: Dict[str, Sequence[float]]):
+        """Append a columnar batch (ts in epoch seconds); NaN values are skipped"""
+        ts_ms = np.round(np.asarray(ts, dtype=np.float64) * 1000).astype(np.int64)
+        with self._lock:
+            device_codes = self._codes(device_ids, self._device_codes, self.devices)
+            parts = []
+            for metric, values in columns.items():
+                values = np.asarray(values, dtype=np.float32)
+                keep = ~np.isnan(values)
+                metric_code = self._codes([metric], self._metric_codes, self.metrics)[0]
+                parts.append({
+                    "ts": ts_ms[keep],
+                    "device": device_codes[keep],
+                    "metric": np.full(int(keep.sum()), metric_code),
+                    "value": values[keep],
+                })
+            if not parts:
+                return
+            batch = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+            order = np.argsort(batch["ts"], kind="stable")
+            batch = {name: column[order] for name, column in batch.items()}
+            offset = 0
+            while offset < len(order):
+                segment = self._active_segment()
+                take = min(self.segment_rows - segment.rows, len(order) - offset)
+                if take > 0:
+                    segment.append({name: column[offset:offset + take] for name, column in batch.items()})
+                    offset += take
+                if segment.rows >= self.segment_rows:
+                    segment.seal()
+                    self._active = None
+            if self._active is not None:
+                self._active.flush()
+
+    def _active_segment(self) -> _Segment:
+        if self._active is None:
+            number = int(os.path.basename(self._segments[-1].path)[4:]) + 1 if self._segments else 0
+            self._active = _Segment(os.path.join(self.root, f"seg-{number:08d}"), self.index_stride)
+            self._segments.append(self._active)
+        return self._active
+
+    def seal(self):
+        """Seal the active segment, e.g. before shutdown or a backup"""
+        with self._lock:
+            if self._active is not None and self._active.rows:
+                self._active.seal()
+                self._active = None
+
+    def drop_before(self, ts: float) -> int:
+        """Delete sealed segments that end before ts; returns segments removed"""
+        cutoff = int(ts * 1000)
+        with self._lock:
+            expired = [s for s in self._segments if s.sealed and s.max_ts is not None and s.max_ts < cutoff]
+            for segment in expired:
+                segment._maps = None
+                for name in os.listdir(segment.path):
+                    os.remove(os.path.join(segment.path, name))
+                os.rmdir(segment.path)
+                self._segments.remove(segment)
+            return len(expired)
+
+    def scan(self, start: float, end: float, device_ids: Optional[Sequence[str]] = None,
+             metrics: Optional[Sequence[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield column batches with start <= ts <= end, one per segment
+
+        Without filters the arrays are read-only views into the memory maps;
+        device/metric filters apply a mask and therefore copy.
+        """
+        start_ms, end_ms = int(np.floor(start * 1000)), int(np.ceil(end * 1000))
+        with self._lock:
+            snapshot = []
+            for segment in self._segments:
+                if not segment.rows or segment.max_ts < start_ms or segment.min_ts > end_ms:
+                    continue
+                if not segment.sealed:
+                    segment.flush()
+                index = segment.index if segment.sealed else np.asarray(segment.index, dtype=COLUMNS["ts"])
+                snapshot.append((segment, segment.rows, index))
+            device_filter = None if device_ids is None else np.array(
+                [self._device_codes[d] for d in device_ids if d in self._device_codes], dtype=np.int64)
+            metric_filter = None if metrics is None else np.array(
+                [self._metric_codes[m] for m in metrics if m in self._metric_codes], dtype=np.int64)
+
+        for segment, rows, index in snapshot:
+            maps = segment.maps(rows)
+            window = segment.window(start_ms, end_ms, rows, index, maps)
+            batch = {name: column[window] for name, column in maps.items()}
+            mask = None
+            if not segment.sorted:
+                mask = (batch["ts"] >= start_ms) & (batch["ts"] <= end_ms)
+            if device_filter is not None:
+                in_devices = np.isin(batch["device"], device_filter)
+                mask = in_devices if mask is None else mask & in_devices
+            if metric_filter is not None:
+                in_metrics = np.isin(batch["metric"], metric_filter)
+                mask = in_metrics if mask is None else mask & in_metrics
+            if mask is not None:
+                batch = {name: column[mask] for name, column in batch.items()}
+            if len(batch["ts"]):
+                yield batch
+
+    def iter_rows(self, start: float, end: float,
+                  device_ids: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Yield wide report rows, laid out like TelemetryStore.iter_rows"""
+        for batch in archive_batches(self, start, end, device_ids):
+            ts = batch["ts"].tolist()
+            devices = batch["device_id"].tolist()
+            columns = [(m, batch[m].tolist()) for m in METRICS]
+            for i, t in enumerate(ts):
+                row = {"timestamp": datetime.fromtimestamp(t / 1000).isoformat(), "device_id": devices[i]}
+                for metric, values in columns:
+                    value = values[i]
+                    row[metric] = "" if math.isnan(value) else round(value, 3)
+                yield row
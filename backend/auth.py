@@ -0,0 +1,150 @@
+"""Password hashing and token sessions
+
+Passwords are stored as PBKDF2-SHA256 hashes ("pbkdf2_sha256$iterations$
+salt$hash"). A session token is "<session id>.<secret>"; the session
+table keeps only a hash of the secret, so a dump of it cannot be replayed.
+Hashing runs in a small thread pool, which bounds how many KDF runs can
+compete for CPU with the rest of the server. Verified tokens are kept in
+an LRU cache, so authenticating a known token is a dict lookup and a
+constant-time compare.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+PASSWORD_ITERATIONS = 600_000
+# Token secrets are 256 random bits, so a light KDF is enough; the cache makes even that rare
+TOKEN_ITERATIONS = 10_000
+SESSION_TTL = 12 * 3600
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def hash_password(password: str, iterations: int = PASSWORD_ITERATIONS, salt: Optional[bytes] = None) -> str:
+    """Encoded PBKDF2-SHA256 hash of password with a random salt"""
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Whether password matches an encoded hash from hash_password()"""
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+    except ValueError:
+        return False
+    if algorithm != "pbkdf2_sha256":
+        return False
+    salt = base64.b64decode(salt + "=" * (-len(salt) % 4))
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, int(iterations))
+    return hmac.compare_digest(_b64(digest), expected)
+
+class SessionStore:
+    """Issues, verifies and revokes session tokens for a users table
+
+    users maps email to {"password_hash": ..., "role": ...}. Tokens that
+    verified successfully are cached (at most cache_size, least recently
+    used evicted first) until their session expires or is revoked.
+    """
+
+    def __init__(self, users: Dict[str, dict], ttl: float = SESSION_TTL,
+                 cache_size: int = 4096, workers: int = 2):
+        self.users = users
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._sessions: Dict[str, dict] = {}
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # session id -> (secret, session)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="kdf")
+        # Unknown emails are checked against this so they take as long as known ones
+        self._dummy_hash = hash_password(secrets.token_hex(8))
+
+    def _hash(self, fn, *args):
+        return self._executor.submit(fn, *args).result()
+
+    def login(self, email: str, password: str) -> Optional[dict]:
+        """A new session ({"token", "email", "role", "expires"}) or None"""
+        if not isinstance(email, str) or not isinstance(password, str):
+            return None
+        user = self.users.get(email)
+        encoded = user["password_hash"] if user else self._dummy_hash
+        if not self._hash(verify_password, password, encoded) or user is None:
+            return None
+
+        session_id, secret = secrets.token_urlsafe(12), secrets.token_urlsafe(32)
+        session = {"email": email, "role": user["role"], "expires": time.time() + self.ttl,
+                   "secret_hash": self._hash(hash_password, secret, TOKEN_ITERATIONS)}
+        with self._lock:
+            self._prune()
+            self._sessions[session_id] = session
+            self._remember(session_id, secret, session)
+        return {"token": f"{session_id}.{secret}", "email": email, "role": session["role"],
+                "expires": session["expires"]}
+
+    def authenticate(self, token: Optional[str]) -> Optional[dict]:
+        """The session for a token, or None if it is unknown, expired or revoked"""
+        session_id, _, secret = (token or "").partition(".")
+        if not secret:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and cached[1]["expires"] > now:
+                self._cache.move_to_end(session_id)
+                if hmac.compare_digest(cached[0], secret):
+                    self.hits += 1
+                    return cached[1]
+                return None
+            session = self._sessions.get(session_id)
+            if session is None or session["expires"] <= now:
+                return None
+            self.misses += 1
+        if not self._hash(verify_password, secret, session["secret_hash"]):
+            return None
+        with self._lock:
+            if self._sessions.get(session_id) is not session:  # revoked while hashing
+                return None
+            self._remember(session_id, secret, session)
+        return session
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """End the session a token belongs to"""
+        session_id = (token or "").partition(".")[0]
+        with self._lock:
+            self._cache.pop(session_id, None)
+            return self._sessions.pop(session_id, None) is not None
+
+    def revoke_user(self, email: str) -> int:
+        """End every session of a user, e.g. after a password change"""
+        with self._lock:
+            ended = [sid for sid, session in self._sessions.items() if session["email"] == email]
+            for session_id in ended:
+                self._cache.pop(session_id, None)
+                del self._sessions[session_id]
+        return len(ended)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def hit_ratio(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def _remember(self, session_id: str, secret: str, session: dict):
+        self._cache[session_id] = (secret, session)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _prune(self):
+        now = time.time()
+        for session_id in [sid for sid, s in self._sessions.items() if s["expires"] <= now]:
+            self._cache.pop(session_id, None)
+            del self._sessions[session_id]
@@ -0,0 +1,48 @@
+"""Benchmark the streaming device importer against parse_csv_devices
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_device_import --rows 100000
+"""
+import argparse
+import io
+import time
+
+from backend.device_import import import_devices
+from backend.utils import parse_csv_devices
+
+def make_csv(rows: int) -> str:
+    """Build a device CSV where ~2% of rows are invalid or duplicated"""
+    out = io.StringIO()
+    out.write("device_id,name,protocol,ip,port,unit_id,location\n")
+    for i in range(rows):
+        protocol = "Modbus" if i % 3 else "BACnet"
+        port = 502 if protocol == "Modbus" else 47808
+        if i % 100 == 7:
+            port = 70000
+        device_id = f"PT-{i - 1 if i % 100 == 13 else i:06d}"
+        out.write(f"{device_id},\"Point {i}, AHU {i % 40}\",{protocol},"
+                  f"10.0.{i // 250 % 256}.{i % 250},{port},{i % 247},Building {chr(65 + i % 5)} - Floor {i % 9}\n")
+    return out.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    content = make_csv(args.rows)
+
+    start = time.perf_counter()
+    legacy = parse_csv_devices(content)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = import_devices(io.StringIO(content))
+    import_time = time.perf_counter() - start
+
+    print(f"{args.rows} rows, {len(content) / 1e6:.1f} MB")
+    print(f"  parse_csv_devices: {legacy_time * 1000:8.1f} ms  {len(legacy)} devices (no error report)")
+    print(f"  import_devices:    {import_time * 1000:8.1f} ms  {len(result['accepted'])} accepted, "
+          f"{len(result['rejected'])} rejected  {args.rows / import_time:,.0f} rows/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Measure pipeline throughput as the worker count grows
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_pipeline --devices 2000 --ticks 50 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from backend.alerts import RuleEngine, default_rules
+from backend.health import HealthEngine
+from backend.pipeline import Pipeline
+from backend.simulator import FleetSimulator
+
+def make_batch(device_ids: list, ticks: int, start: float) -> dict:
+    data = FleetSimulator(device_ids, seed=0).step(ticks)
+    columns = {metric: values.reshape(-1) for metric, values in data.items()}
+    columns["device_id"] = np.repeat(np.array(device_ids), ticks).tolist()
+    columns["ts"] = start + np.tile(np.arange(ticks, dtype=np.float64), len(device_ids))
+    return columns
+
+def bench_inline(batches: list) -> float:
+    """The single-process path: health and rules evaluated in the caller"""
+    health = HealthEngine(window=None, window_seconds=900)
+    rules = RuleEngine(default_rules())
+    start = time.perf_counter()
+    for batch in batches:
+        health.update_many(batch["device_id"], batch["status"].tolist(), batch["ts"].tolist())
+        rules.evaluate(batch)
+    return time.perf_counter() - start
+
+def bench_pipeline(batches: list, workers: int) -> float:
+    pipeline = Pipeline(workers=workers, publish_interval=0.05)
+    pipeline.start()
+    try:
+        pipeline.submit(batches[0])  # warm up the workers
+        pipeline.wait(120)
+        start = time.perf_counter()
+        for batch in batches[1:]:
+            pipeline.submit(batch)
+        pipeline.wait(600)
+        return time.perf_counter() - start
+    finally:
+        pipeline.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    device_ids = [f"DEV-{i:05d}" for i in range(args.devices)]
+    now = time.time()
+    batches = [make_batch(device_ids, args.ticks, now + i * args.ticks) for i in range(args.batches + 1)]
+    rows = args.devices * args.ticks * args.batches
+
+    print(f"{rows} readings ({args.batches} batches of {args.devices} devices x {args.ticks} ticks), "
+          f"{os.cpu_count()} cores")
+    inline = bench_inline(batches[1:])
+    print(f"  inline:     {inline * 1000:9.2f} ms  {rows / inline:12,.0f} readings/s")
+    for workers in args.workers:
+        elapsed = bench_pipeline(batches, workers)
+        print(f"  {workers:2d} workers: {elapsed * 1000:9.2f} ms  {rows / elapsed:12,.0f} readings/s  "
+              f"({inline / elapsed:.1f}x inline)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare the scalar and batched device simulators
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_simulator --devices 1000 --ticks 50
+"""
+import argparse
+import time
+
+from backend.simulator import FleetSimulator
+from backend.utils import simulate_device_data
+
+def bench_scalar(device_ids: list, ticks: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for device_id in device_ids:
+            simulate_device_data(device_id)
+    return time.perf_counter() - start
+
+def bench_fleet(device_ids: list, ticks: int) -> float:
+    simulator = FleetSimulator(device_ids, seed=0)
+    start = time.perf_counter()
+    simulator.step(ticks)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    device_ids = [f"DEV-{i:05d}" for i in range(args.devices)]
+    points = args.devices * args.ticks
+
+    scalar = min(bench_scalar(device_ids, args.ticks) for _ in range(args.repeat))
+    fleet = min(bench_fleet(device_ids, args.ticks) for _ in range(args.repeat))
+
+    print(f"{points} points ({args.devices} devices x {args.ticks} ticks), best of {args.repeat}")
+    print(f"  simulate_device_data: {scalar * 1000:9.2f} ms  {points / scalar:12,.0f} points/s")
+    print(f"  FleetSimulator.step:  {fleet * 1000:9.2f} ms  {points / fleet:12,.0f} points/s")
+    print(f"  speedup: {scalar / fleet:.1f}x")
+
+if __name__ == "__main__":
+    main()
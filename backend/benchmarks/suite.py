@@ -0,0 +1,283 @@
+"""Benchmark suite for the backend hot paths and the API routes
+
+Record a baseline, then compare a later run against it:
+    python -m backend.benchmarks.suite run --output baseline.json
+    python -m backend.benchmarks.suite compare baseline.json --threshold 0.15
+
+compare re-runs the suite unless a second results file is given, prints
+the change per benchmark and exits non-zero if any p50 slowed down by
+more than the threshold.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+# The routes are measured against a quiet simulation: one tick, then none
+os.environ.setdefault("SIMULATION_INTERVAL", "3600")
+
+from backend.benchmarks.bench_device_import import make_csv
+from backend.device_import import import_devices
+from backend.eventlog import EventLog
+from backend.reports import iter_report_csv
+from backend.simulator import FleetSimulator
+from backend.utils import calculate_device_health, generate_report, parse_csv_devices, simulate_device_data
+
+SIZES = {
+    "quick": {"rows": [10, 1000, 100_000], "devices": [5, 500]},
+    "full": {"rows": [10, 1000, 100_000, 1_000_000], "devices": [5, 500, 50_000]},
+}
+MIN_TIME = 0.2      # seconds of samples to collect per benchmark
+MAX_SAMPLES = 50
+REQUESTS = 200      # per route and fleet size
+
+BENCHMARKS = []
+
+def benchmark(name: str, param: str):
+    """Register fn(size) -> callable; only the returned callable is timed"""
+    def register(fn):
+        BENCHMARKS.append((name, param, fn))
+        return fn
+    return register
+
+def report_rows(rows: int) -> List[dict]:
+    start = datetime(2024, 1, 1)
+    return [{"timestamp": (start + timedelta(seconds=i)).isoformat(), "device_id": f"DEV-{i % 500:05d}",
+             "metric": "temperature", "value": 20.0 + i % 13 * 0.5} for i in range(rows)]
+
+@benchmark("simulate_device_data", "devices")
+def bench_simulate_device_data(devices: int) -> Callable:
+    device_ids = [f"DEV-{i:05d}" for i in range(devices)]
+    return lambda: [simulate_device_data(d) for d in device_ids]
+
+@benchmark("FleetSimulator.step", "devices")
+def bench_fleet_step(devices: int) -> Callable:
+    simulator = FleetSimulator([f"DEV-{i:05d}" for i in range(devices)], seed=0)
+    return lambda: simulator.step(1)
+
+@benchmark("generate_report", "rows")
+def bench_generate_report(rows: int) -> Callable:
+    data = report_rows(rows)
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    return lambda: generate_report(data, start, end)
+
+@benchmark("iter_report_csv", "rows")
+def bench_iter_report_csv(rows: int) -> Callable:
+    data = report_rows(rows)
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    return lambda: sum(len(chunk) for chunk in iter_report_csv(data, start, end))
+
+@benchmark("parse_csv_devices", "rows")
+def bench_parse_csv_devices(rows: int) -> Callable:
+    content = make_csv(rows)
+    return lambda: parse_csv_devices(content)
+
+@benchmark("import_devices", "rows")
+def bench_import_devices(rows: int) -> Callable:
+    content = make_csv(rows)
+    return lambda: import_devices(io.StringIO(content))
+
+@benchmark("calculate_device_health", "rows")
+def bench_calculate_device_health(rows: int) -> Callable:
+    telemetry = [{"status": (0, 0, 0, 0, 0, 0, 0, 0, 1, 2)[i % 10]} for i in range(rows)]
+    return lambda: calculate_device_health(telemetry)
+
+@benchmark("EventLog.query", "rows")
+def bench_event_log_query(rows: int) -> Callable:
+    log = EventLog(max_events=rows)
+    kinds = ("alert_opened", "alert_resolved", "user_login", "device_added")
+    log.extend((kinds[i % 4], f"DEV-{i % 500:05d}", f"Temperature above {20 + i % 13} C on sensor {i % 7}")
+               for i in range(rows))
+    # Deep page of a filtered, text-searched query
+    return lambda: log.query(event_type="alert_opened", text="temp sens", limit=100, cursor=rows // 2)
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "samples": len(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "p50": percentile(samples, 0.50),
+        "p99": percentile(samples, 0.99),
+    }
+
+def time_callable(fn: Callable) -> List[float]:
+    """Run fn until MIN_TIME has been spent (at least 3 runs, at most MAX_SAMPLES)"""
+    fn()  # warm-up
+    samples, spent = [], 0.0
+    while len(samples) < 3 or (spent < MIN_TIME and len(samples) < MAX_SAMPLES):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        spent += elapsed
+    return samples
+
+def run_functions(sizes: dict, selected: Callable[[str], bool]) -> Dict[str, dict]:
+    results = {}
+    for name, param, fn in BENCHMARKS:
+        for size in sizes[param]:
+            key = f"{name}[{param}={size}]"
+            if not selected(key):
+                continue
+            stats = summarize(time_callable(fn(size)))
+            stats["ops_per_s"] = size / stats["p50"]
+            results[key] = stats
+            print(f"  {key:45s} p50 {stats['p50'] * 1000:10.3f} ms  p99 {stats['p99'] * 1000:10.3f} ms", flush=True)
+    return results
+
+def drive(client, path: str, requests: int, concurrency: int = 1, headers: dict = None) -> List[float]:
+    """Issue requests GETs from concurrency threads; returns per-request latencies"""
+    latencies = []
+    lock = threading.Lock()
+    per_thread = max(1, requests // concurrency)
+
+    def worker():
+        own = []
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            response = client.get(path, headers=headers)
+            response.get_data()
+            own.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"GET {path} returned {response.status_code}")
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+def route_paths() -> List[str]:
+    now = time.time()
+    return [
+        "/api/devices",
+        "/api/devices?status=online&limit=100",
+        "/api/devices/health",
+        "/api/alerts",
+        "/api/summary",
+        "/api/logs",
+        "/api/telemetry/1",
+        "/api/telemetry/1?shape=columns",
+        f"/api/reports/export?from={now - 3600:.0f}&to={now + 60:.0f}",
+    ]
+
+def run_routes(sizes: dict, selected: Callable[[str], bool], requests: int, concurrency: int) -> Dict[str, dict]:
+    import app as bms_app
+
+    client = bms_app.app.test_client()
+    login = client.post("/api/login", json={"email": "admin@voltas.com", "password": "admin123"}).get_json()
+    headers = {"Authorization": f"Bearer {login['token']}"}
+    client.get("/api/devices", headers=headers)  # start the producer and record one simulated tick
+    results = {}
+    for devices in sizes["devices"]:
+        # Grow the registry to the requested fleet size, then give every device a reading
+        for i in range(len(bms_app.registry), devices):
+            bms_app.registry.add({"name": f"Bench Device {i}", "status": "online", "temperature": 22.0,
+                                  "co2": 450, "location": f"Building {chr(65 + i % 6)} - Floor {i % 12}"})
+        bms_app.simulate_tick()
+        for path in route_paths():
+            key = f"GET {path.split('?from=')[0]}[devices={devices}]"
+            if not selected(key):
+                continue
+            start = time.perf_counter()
+            latencies = drive(client, path, requests, concurrency, headers)
+            stats = summarize(latencies)
+            stats["ops_per_s"] = len(latencies) / (time.perf_counter() - start)
+            results[key] = stats
+            print(f"  {key:45s} p50 {stats['p50'] * 1000:10.3f} ms  p99 {stats['p99'] * 1000:10.3f} ms", flush=True)
+    return results
+
+def run_suite(args) -> dict:
+    sizes = SIZES[args.sizes]
+    selected = (lambda key: args.filter in key) if args.filter else (lambda key: True)
+    print(f"Running {args.sizes} suite", flush=True)
+    results = {}
+    if not args.routes_only:
+        results.update(run_functions(sizes, selected))
+    if not args.functions_only:
+        results.update(run_routes(sizes, selected, args.requests, args.concurrency))
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": args.sizes,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float, metric: str = "p50") -> List[str]:
+    """Print the change per benchmark and return the keys that regressed"""
+    regressions = []
+    print(f"{'benchmark':55s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for key, stats in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            print(f"{key:55s} {'-':>12s} {stats[metric] * 1000:10.3f}ms {'new':>8s}")
+            continue
+        change = stats[metric] / before[metric] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"{key:55s} {before[metric] * 1000:10.3f}ms {stats[metric] * 1000:10.3f}ms {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the suite and write the results as JSON")
+    run.add_argument("--output", default="benchmark-results.json")
+    check = commands.add_parser("compare", help="compare against a baseline, failing on regressions")
+    check.add_argument("baseline")
+    check.add_argument("current", nargs="?", help="results file to compare; re-runs the suite if omitted")
+    check.add_argument("--threshold", type=float, default=0.15, help="allowed p50 slowdown (0.15 = 15%%)")
+    for sub in (run, check):
+        sub.add_argument("--sizes", choices=sorted(SIZES), default="quick")
+        sub.add_argument("--filter", help="only run benchmarks whose name contains this text")
+        sub.add_argument("--requests", type=int, default=REQUESTS)
+        sub.add_argument("--concurrency", type=int, default=1)
+        sub.add_argument("--functions-only", action="store_true")
+        sub.add_argument("--routes-only", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run_suite(args)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {len(results['results'])} results to {args.output}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+class ResponseCache:
+    """Pre-serialized response bodies keyed by endpoint/query and data version
+
+    Each topic ("devices", "alerts", ...) has a version number, either read
+    from the data source through a registered callable or kept here and
+    advanced with bump(). An entry is reused while its topic version is
+    unchanged and it is younger than ttl; the least recently used entries
+    are evicted beyond max_entries. ETags derive from the version alone, so
+    a conditional request can be answered without building anything.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._sources: Dict[str, Callable[[], int]] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Distinguishes ETags across restarts, when version counters reset
+        self._epoch = secrets.token_hex(4)
+
+    def register(self, topic: str, version: Callable[[], int]):
+        """Take a topic's version from its data source"""
+        self._sources[topic] = version
+
+    def bump(self, topic: str):
+        """Invalidate a topic without a registered version source"""
+        with self._lock:
+            self._counters[topic] = self._counters.get(topic, 0) + 1
+
+    def version(self, topic: str) -> int:
+        source = self._sources.get(topic)
+        return source() if source else self._counters.get(topic, 0)
+
+    def etag(self, topic: str, key: str) -> str:
+        """Strong entity tag (unquoted) for a topic/key at its current version"""
+        return f"{self._epoch}-{topic}-{self.version(topic)}-{zlib.crc32(key.encode()):08x}"
+
+    def get(self, topic: str, key: str, build: Callable[[], Tuple[bytes, dict]]) -> Tuple[str, bytes, dict]:
+        """Return (etag, body, headers), calling build() only on a miss"""
+        version = self.version(topic)
+        cache_key = (topic, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[2], entry[3], entry[4]
+            self.misses += 1
+
+        etag = self.etag(topic, key)
+        body, headers = build()
+        with self._lock:
+            self._entries[cache_key] = (version, now + self.ttl, etag, body, headers)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body, headers
+
+    def hit_ratio(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
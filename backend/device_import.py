@@ -0,0 +1,118 @@
+import csv
+import io
+import os
+from typing import IO, Iterable, Iterator, Tuple, Union
+
+from backend.utils import device_config_errors
+
+BATCH_SIZE = 1000
+
+Source = Union[str, os.PathLike, IO]
+
+def _endpoint_key(config: dict) -> tuple:
+    # Several Modbus/BACnet points can sit behind one gateway ip:port,
+    # they are told apart by unit_id and, for polled points, by register range
+    key = (config.get('ip'), config.get('port'), config.get('unit_id', ''))
+    if 'register' in config:
+        key += (str(config['register']), str(config.get('count', 1)))
+    return key
+
+def _describe_endpoint(key: tuple) -> str:
+    where = f"endpoint {key[0]}:{key[1]}"
+    return where if len(key) == 3 else f"{where} register {key[3]}"
+
+def _open_text(source: Source) -> Tuple[IO, bool]:
+    """Return a text stream for source and whether we own (must close) it"""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, newline='', encoding='utf-8-sig'), True
+    if isinstance(source, io.TextIOBase):
+        return source, False
+    return io.TextIOWrapper(source, encoding='utf-8-sig', newline=''), False
+
+class DeviceIndex:
+    """Hash indexes used to reject duplicate device_ids and endpoints"""
+
+    def __init__(self, existing: Iterable[dict] = ()):
+        self.device_ids = {}
+        self.endpoints = {}
+        for config in existing:
+            self.add(config, None)
+
+    def add(self, config: dict, line):
+        if 'device_id' in config:
+            self.device_ids.setdefault(config['device_id'], line)
+        if 'ip' in config and 'port' in config:
+            self.endpoints.setdefault(_endpoint_key(config), line)
+
+    def conflicts(self, config: dict) -> list:
+        reasons = []
+        if config.get('device_id') in self.device_ids:
+            reasons.append(_duplicate_reason(f"device_id {config['device_id']}", self.device_ids[config['device_id']]))
+        key = _endpoint_key(config)
+        if key in self.endpoints:
+            reasons.append(_duplicate_reason(_describe_endpoint(key), self.endpoints[key]))
+        return reasons
+
+def _duplicate_reason(what: str, line) -> str:
+    return f"duplicate {what} (line {line})" if line else f"duplicate {what} (already registered)"
+
+def _clean_row(row: dict) -> dict:
+    """Strip values, drop empty cells and convert the port column"""
+    config = {}
+    for key, value in row.items():
+        # Extra cells beyond the header land under None and are ignored
+        if key is None or value is None:
+            continue
+        value = value.strip()
+        if value:
+            config[key.strip()] = value
+    if 'port' in config:
+        try:
+            config['port'] = int(config['port'])
+        except ValueError:
+            pass  # left as a string, reported by device_config_errors
+    return config
+
+def iter_device_batches(source: Source, batch_size: int = BATCH_SIZE,
+                        existing: Iterable[dict] = ()) -> Iterator[Tuple[list, list]]:
+    """Stream a device CSV as (accepted, rejected) batches
+
+    Rows are validated with the same rules as validate_device_config and
+    checked against a hash index of device_ids and endpoints seen so far
+    (including any existing devices). An endpoint is ip:port:unit_id, plus
+    the register range for rows with polling columns. Rejected rows are
+    reported as {"line", "device_id", "reasons"} using the physical line
+    number in the file.
+    """
+    stream, owned = _open_text(source)
+    try:
+        reader = csv.DictReader(stream, skipinitialspace=True)
+        if reader.fieldnames:
+            reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        index = DeviceIndex(existing)
+        accepted, rejected = [], []
+        for row in reader:
+            line = reader.line_num
+            config = _clean_row(row)
+            reasons = device_config_errors(config) + index.conflicts(config)
+            if reasons:
+                rejected.append({"line": line, "device_id": config.get('device_id'), "reasons": reasons})
+            else:
+                index.add(config, line)
+                accepted.append(config)
+            if len(accepted) + len(rejected) >= batch_size:
+                yield accepted, rejected
+                accepted, rejected = [], []
+        if accepted or rejected:
+            yield accepted, rejected
+    finally:
+        if owned:
+            stream.close()
+
+def import_devices(source: Source, batch_size: int = BATCH_SIZE, existing: Iterable[dict] = ()) -> dict:
+    """Import a device CSV, returning accepted devices and a rejection report"""
+    accepted, rejected = [], []
+    for batch_accepted, batch_rejected in iter_device_batches(source, batch_size, existing):
+        accepted.extend(batch_accepted)
+        rejected.extend(batch_rejected)
+    return {"accepted": accepted, "rejected": rejected, "total_rows": len(accepted) + len(rejected)}
@@ -0,0 +1,301 @@
+"""Bounded in-memory event log with indexed, cursor-paginated queries
+
+Events go into time-ordered segments. Each segment keeps its rows as
+columns (timestamps, device and event type codes, messages) plus
+posting lists by device, by event type and by lowercased message word.
+A query walks the segments newest first, skips those outside the time
+range or past the cursor, and intersects posting lists instead of
+scanning rows. Pages are keyed by event id, so fetching page n costs the
+same as fetching page 1.
+
+A segment is sealed when it is full or spans segment_seconds. Small
+sealed segments are merged into their neighbours (compaction), and the
+oldest segments are dropped once they pass max_age or the log holds more
+than max_events. Ageing also runs on query() and expire(), so events age
+out on a quiet site where nothing seals a segment.
+"""
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SEGMENT_EVENTS = 16384
+SEGMENT_SECONDS = 3600.0
+MAX_EVENTS = 2_000_000
+MAX_AGE = 7 * 86400.0
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Distinct lowercased words of text, in order of appearance"""
+    return list(dict.fromkeys(_WORD.findall(text.lower())))
+
+class _Segment:
+    """A run of consecutive events; ids are first_id + row position"""
+
+    def __init__(self, first_id: int, capacity: int):
+        self.first_id = first_id
+        self.count = 0
+        self.ts = np.empty(capacity, dtype=np.float64)
+        self.device = np.empty(capacity, dtype=np.int32)
+        self.event_type = np.empty(capacity, dtype=np.int32)
+        self.messages: List[str] = []
+        self.min_ts = self.max_ts = None
+        self.sealed = False
+        # Posting lists: code or word -> row positions, ascending
+        self.by_device = defaultdict(list)
+        self.by_type = defaultdict(list)
+        self.by_word = defaultdict(list)
+        self.words: List[str] = []  # sorted vocabulary, for prefix lookups once sealed
+
+    @property
+    def end_id(self) -> int:
+        return self.first_id + self.count
+
+    @property
+    def full(self) -> bool:
+        return self.count == len(self.ts)
+
+    def append(self, ts: float, device: int, event_type: int, message: str):
+        row = self.count
+        self.ts[row], self.device[row], self.event_type[row] = ts, device, event_type
+        self.messages.append(message)
+        self.by_device[device].append(row)
+        self.by_type[event_type].append(row)
+        for word in tokenize(message):
+            self.by_word[word].append(row)
+        self.count += 1
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+
+    def seal(self):
+        """Trim the columns and freeze the posting lists into arrays"""
+        for name in ("ts", "device", "event_type"):
+            setattr(self, name, getattr(self, name)[:self.count].copy())
+        for postings in (self.by_device, self.by_type, self.by_word):
+            for key, rows in postings.items():
+                postings[key] = np.asarray(rows, dtype=np.int32)
+        self.by_device, self.by_type, self.by_word = dict(self.by_device), dict(self.by_type), dict(self.by_word)
+        self.words = sorted(self.by_word)
+        self.sealed = True
+
+    @classmethod
+    def merge(cls, segments: Sequence["_Segment"]) -> "_Segment":
+        """One sealed segment holding the events of consecutive segments"""
+        merged = cls(segments[0].first_id, sum(s.count for s in segments))
+        for segment in segments:
+            for row in range(segment.count):
+                merged.append(float(segment.ts[row]), int(segment.device[row]),
+                              int(segment.event_type[row]), segment.messages[row])
+        merged.seal()
+        return merged
+
+    def _postings(self, index, key) -> np.ndarray:
+        rows = index.get(key)
+        if rows is None:
+            return np.empty(0, dtype=np.int32)
+        return rows if self.sealed else np.asarray(rows, dtype=np.int32)
+
+    def _prefix_postings(self, prefix: str) -> np.ndarray:
+        if self.sealed:
+            lo = bisect.bisect_left(self.words, prefix)
+            hi = bisect.bisect_left(self.words, prefix + "\U0010ffff")
+            matches = self.words[lo:hi]
+        else:
+            matches = [word for word in self.by_word if word.startswith(prefix)]
+        if not matches:
+            return np.empty(0, dtype=np.int32)
+        if len(matches) == 1:
+            return self._postings(self.by_word, matches[0])
+        return np.unique(np.concatenate([self._postings(self.by_word, word) for word in matches]))
+
+    def rows(self, device: Optional[int], event_type: Optional[int], prefixes: Sequence[str],
+             start: Optional[float], end: Optional[float], before: Optional[int]) -> np.ndarray:
+        """Ascending row positions matching every filter"""
+        candidates = []
+        if device is not None:
+            candidates.append(self._postings(self.by_device, device))
+        if event_type is not None:
+            candidates.append(self._postings(self.by_type, event_type))
+        candidates.extend(self._prefix_postings(prefix) for prefix in prefixes)
+
+        limit = self.count if before is None else min(self.count, max(0, before - self.first_id))
+        if candidates:
+            candidates.sort(key=len)
+            rows = candidates[0]
+            for other in candidates[1:]:
+                if not len(rows):
+                    break
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            rows = rows[:np.searchsorted(rows, limit)]
+        else:
+            rows = np.arange(limit, dtype=np.int32)
+        if start is not None or end is not None:
+            ts = self.ts[rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts <= end
+            rows = rows[mask]
+        return rows
+
+class EventLog:
+    """Append-only event log bounded by event count and age
+
+    Events are dicts with "id", "ts" (epoch seconds), "timestamp" (ISO
+    8601), "event_type", "device" and "message". query() returns them
+    newest first.
+    """
+
+    def __init__(self, segment_events: int = SEGMENT_EVENTS, segment_seconds: float = SEGMENT_SECONDS,
+                 max_events: int = MAX_EVENTS, max_age: float = MAX_AGE):
+        self.segment_events = segment_events
+        self.segment_seconds = segment_seconds
+        self.max_events = max_events
+        self.max_age = max_age
+        self.version = 0
+        self.dropped = 0
+        self._segments: List[_Segment] = []
+        self._next_id = 1
+        self._events = 0
+        self._codes: Dict[str, Dict[str, int]] = {"device": {}, "event_type": {}}
+        self._names: Dict[str, List[str]] = {"device": [], "event_type": []}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._events
+
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    def _code(self, kind: str, name: str) -> int:
+        code = self._codes[kind].get(name)
+        if code is None:
+            code = self._codes[kind][name] = len(self._names[kind])
+            self._names[kind].append(name)
+        return code
+
+    def append(self, event_type: str, device: str, message: str, ts: Optional[float] = None) -> int:
+        """Record one event and return its id"""
+        return self.extend([(event_type, device, message)], ts)
+
+    def extend(self, events: Iterable[Tuple[str, str, str]], ts: Optional[float] = None) -> int:
+        """Record (event_type, device, message) tuples at ts (default now); returns the last id"""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for event_type, device, message in events:
+                segment = self._segments[-1] if self._segments else None
+                if (segment is None or segment.sealed or segment.full
+                        or ts - segment.min_ts > self.segment_seconds):
+                    if segment is not None and not segment.sealed:
+                        segment.seal()
+                        self._maintain(ts)
+                    segment = _Segment(self._next_id, self.segment_events)
+                    self._segments.append(segment)
+                segment.append(ts, self._code("device", str(device)),
+                               self._code("event_type", str(event_type)), str(message))
+                self._next_id += 1
+                self._events += 1
+            self.version += 1
+            return self._next_id - 1
+
+    def _maintain(self, now: float):
+        """Merge small sealed neighbours and drop segments past max_age or max_events"""
+        sealed = [s for s in self._segments if s.sealed]
+        if len(sealed) >= 2:
+            last, previous = sealed[-1], sealed[-2]
+            if previous.count + last.count <= self.segment_events:
+                i = self._segments.index(previous)
+                self._segments[i:i + 2] = [_Segment.merge([previous, last])]
+        self._expire(now)
+
+    def _expire(self, now: float) -> int:
+        """Drop the oldest segments past max_age or beyond max_events; returns events dropped"""
+        dropped = 0
+        while self._segments:
+            oldest = self._segments[0]
+            # An open segment can age out too, or a quiet log would keep its events forever
+            aged = oldest.count and oldest.max_ts < now - self.max_age
+            if not aged and not (len(self._segments) > 1 and self._events > self.max_events):
+                break
+            self._segments.pop(0)
+            self._events -= oldest.count
+            dropped += oldest.count
+        self.dropped += dropped
+        return dropped
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop events past max_age without waiting for an append; returns events dropped"""
+        with self._lock:
+            dropped = self._expire(time.time() if now is None else now)
+            if dropped:
+                self.version += 1
+            return dropped
+
+    def compact(self, now: Optional[float] = None):
+        """Seal the open segment and run compaction and ageing immediately"""
+        with self._lock:
+            if self._segments and not self._segments[-1].sealed and self._segments[-1].count:
+                self._segments[-1].seal()
+            self._maintain(time.time() if now is None else now)
+            self.version += 1
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              device: Optional[str] = None, event_type: Optional[str] = None,
+              text: Optional[str] = None, limit: int = 100,
+              cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """Return (events, next_cursor), newest first
+
+        text matches events whose message has a word starting with each of
+        its words. Pass next_cursor back as cursor for the following page;
+        it is None on the last page.
+        """
+        prefixes = tokenize(text or "")
+        events = []
+        with self._lock:
+            if self._expire(time.time()):
+                self.version += 1
+            device_code = self._codes["device"].get(device) if device is not None else None
+            type_code = self._codes["event_type"].get(event_type) if event_type is not None else None
+            if (device is not None and device_code is None) or (event_type is not None and type_code is None):
+                return [], None
+            for segment in reversed(self._segments):
+                if cursor is not None and segment.first_id >= cursor:
+                    continue
+                if not segment.count or (start is not None and segment.max_ts < start) \
+                        or (end is not None and segment.min_ts > end):
+                    continue
+                rows = segment.rows(device_code, type_code, prefixes, start, end, cursor)
+                for row in rows[::-1][:limit + 1 - len(events)].tolist():
+                    events.append(self._event(segment, row))
+                if len(events) > limit:
+                    break
+        if len(events) > limit:
+            return events[:limit], events[limit - 1]["id"]
+        return events, None
+
+    def _event(self, segment: _Segment, row: int) -> dict:
+        ts = float(segment.ts[row])
+        return {
+            "id": segment.first_id + row,
+            "ts": ts,
+            "timestamp": datetime.fromtimestamp(ts).isoformat(),
+            "event_type": self._names["event_type"][segment.event_type[row]],
+            "device": self._names["device"][segment.device[row]],
+            "message": segment.messages[row],
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "events": self._events,
+                "segments": len(self._segments),
+                "dropped": self.dropped,
+                "oldest": self._segments[0].min_ts if self._segments else None,
+            }
@@ -0,0 +1,240 @@
+"""Columnar binary report exports: Arrow IPC, Parquet and NumPy .npz
+
+Reports are written batch by batch from an iterator of column dicts, so
+memory stays bounded by one batch. Telemetry batches use typed columns:
+int64 epoch-millisecond timestamps, float32 metrics and an int8 status.
+Arrow and Parquet need pyarrow. The .npz format needs only NumPy and
+holds one array per column per batch ("000000/ts", "000000/temperature",
+...), which load_npz() concatenates.
+"""
+import io
+import json
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from backend.simulator import METRICS, classify_status_array
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet exports fall back to .npz
+    pa = pq = None
+
+FORMATS = ("npz", "arrow", "parquet")
+MIMETYPES = {
+    "npz": "application/zip",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXTENSIONS = {"npz": "npz", "arrow": "arrows", "parquet": "parquet"}
+BATCH_ROWS = 65536  # small batches are merged up to this size before writing
+
+def resolve_format(name: str) -> str:
+    """The format that will actually be written for a requested one"""
+    if name not in FORMATS:
+        raise ValueError(f"Unsupported export format: {name}")
+    if name in ("arrow", "parquet") and pa is None:
+        return "npz"
+    return name
+
+def telemetry_batch(ts_ms: np.ndarray, device_ids: Sequence[str], columns: Dict[str, np.ndarray]) -> dict:
+    """Typed export columns from epoch-millisecond timestamps and metric arrays"""
+    n = len(ts_ms)
+    batch = {
+        "ts": np.asarray(ts_ms, dtype=np.int64),
+        "device_id": np.asarray(device_ids, dtype=str),
+    }
+    for metric in METRICS:
+        values = columns.get(metric)
+        batch[metric] = np.full(n, np.nan, dtype=np.float32) if values is None else np.asarray(values, dtype=np.float32)
+    batch["status"] = classify_status_array(batch["temperature"], batch["co2_ppm"])
+    return batch
+
+def store_batches(store, start: float, end: float,
+                  device_ids: Optional[Sequence[str]] = None) -> Iterator[dict]:
+    """One export batch per device from a TelemetryStore"""
+    for device_id in device_ids or store.device_ids():
+        result = store.query(device_id, start, end, resolution="raw")
+        if result is None or not len(result["ts"]):
+            continue
+        ts_ms = np.round(result["ts"] * 1000).astype(np.int64)
+        yield telemetry_batch(ts_ms, np.full(len(ts_ms), device_id), result)
+
+def _pivot(archive, batch: Dict[str, np.ndarray]) -> dict:
+    # Archived metrics outside METRICS have no export column and are left out
+    columns = np.array([METRICS.index(m) if m in METRICS else -1 for m in archive.metrics], dtype=np.int64)
+    codes = columns[batch["metric"]]
+    known = codes >= 0
+    if not known.all():
+        batch = {name: column[known] for name, column in batch.items()}
+        codes = codes[known]
+    devices = batch["device"].astype(np.int64)
+    key = batch["ts"] * len(archive.devices) + devices
+    keys, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    values = np.full((len(keys), len(METRICS)), np.nan, dtype=np.float32)
+    values[inverse, codes] = batch["value"]
+    names = np.asarray(archive.devices, dtype=str)[devices[first]]
+    return telemetry_batch(batch["ts"][first], names, {m: values[:, i] for i, m in enumerate(METRICS)})
+
+def archive_batches(archive, start: float, end: float,
+                    device_ids: Optional[Sequence[str]] = None) -> Iterator[dict]:
+    """Export batches from a TelemetryArchive, pivoting its long rows to wide
+
+    Readings of one device at one timestamp become a single row; metrics
+    that were not recorded are NaN. A reading's metrics are stored
+    together, but its last one can land in the next segment, so rows
+    sharing the timestamp of a batch's final row are held back and joined
+    to the next batch.
+    """
+    pending = None
+    for batch in archive.scan(start, end, device_ids, METRICS):
+        if pending is not None:
+            batch = {name: np.concatenate([pending[name], column]) for name, column in batch.items()}
+        tail = batch["ts"] == batch["ts"][-1]
+        pending = {name: column[tail] for name, column in batch.items()}
+        if not tail.all():
+            yield _pivot(archive, {name: column[~tail] for name, column in batch.items()})
+    if pending is not None:
+        yield _pivot(archive, pending)
+
+def rows_to_batch(rows: List[dict]) -> dict:
+    """Column arrays for arbitrary report rows, typed from their values
+
+    Numbers become float32 (int8 for "status"), "ts"/"timestamp" values
+    become int64 epoch milliseconds, anything else becomes text.
+    """
+    headers = list(rows[0].keys()) if rows else []
+    batch = {}
+    for header in headers:
+        values = [row.get(header) for row in rows]
+        if header in ("ts", "timestamp"):
+            batch["ts"] = np.array([_epoch_ms(v) for v in values], dtype=np.int64)
+        elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            dtype = np.int8 if header == "status" else np.float32
+            batch[header] = np.asarray(values, dtype=dtype)
+        else:
+            batch[header] = np.asarray(["" if v is None else str(v) for v in values], dtype=str)
+    return batch
+
+def _epoch_ms(value) -> int:
+    if isinstance(value, datetime):
+        return round(value.timestamp() * 1000)
+    if isinstance(value, str):
+        return round(datetime.fromisoformat(value).timestamp() * 1000)
+    return round(float(value) * 1000)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink whose contents are drained between batches"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _arrow_batch(batch: dict, schema=None):
+    arrays, names = [], []
+    for name, values in batch.items():
+        if name == "ts":
+            arrays.append(pa.array(values, type=pa.timestamp("ms", tz="UTC")))
+        else:
+            arrays.append(pa.array(values))
+        names.append(name)
+    if schema is not None:
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+def coalesce_batches(batches: Iterable[dict], rows: int = BATCH_ROWS) -> Iterator[dict]:
+    """Merge consecutive small batches so each written one holds ~rows rows"""
+    def merge(pending):
+        if len(pending) == 1:
+            return pending[0]
+        return {name: np.concatenate([b[name] for b in pending]) for name in pending[0]}
+
+    pending, count = [], 0
+    for batch in batches:
+        pending.append(batch)
+        count += len(batch["ts"])
+        if count >= rows:
+            yield merge(pending)
+            pending, count = [], 0
+    if pending:
+        yield merge(pending)
+
+def iter_export(batches: Iterable[dict], fmt: str, metadata: Optional[dict] = None) -> Iterator[bytes]:
+    """Stream batches in fmt ("npz", "arrow" or "parquet") as byte chunks
+
+    metadata (e.g. the report period) goes into report.json in .npz files
+    and into the schema metadata of Arrow/Parquet files.
+    """
+    fmt = resolve_format(fmt)
+    batches = coalesce_batches(batches)
+    sink = _ChunkSink()
+    metadata = metadata or {}
+
+    if fmt == "npz":
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+            columns = None
+            count = 0
+            for count, batch in enumerate(batches, 1):
+                columns = columns or list(batch)
+                for name, values in batch.items():
+                    with archive.open(f"{count - 1:06d}/{name}.npy", "w", force_zip64=True) as f:
+                        np.lib.format.write_array(f, np.ascontiguousarray(values), allow_pickle=False)
+                yield sink.drain()
+            archive.writestr("report.json", json.dumps(dict(metadata, columns=columns or [], batches=count)))
+        yield sink.drain()
+        return
+
+    def open_writer(first: dict):
+        schema = _arrow_batch(first).schema.with_metadata({k: str(v) for k, v in metadata.items()})
+        return schema, (pa.ipc.new_stream(sink, schema) if fmt == "arrow" else pq.ParquetWriter(sink, schema))
+
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                schema, writer = open_writer(batch)
+            record = _arrow_batch(batch, schema)
+            if fmt == "arrow":
+                writer.write_batch(record)
+            else:
+                writer.write_table(pa.Table.from_batches([record]))
+            yield sink.drain()
+        if writer is None:
+            # No rows: still write a valid (empty) file with the telemetry schema
+            _, writer = open_writer(telemetry_batch(np.empty(0, dtype=np.int64), [], {}))
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+def write_export(batches: Iterable[dict], fmt: str, metadata: Optional[dict] = None) -> bytes:
+    return b"".join(iter_export(batches, fmt, metadata))
+
+def load_npz(source) -> Dict[str, np.ndarray]:
+    """Read an exported .npz (path or file object) back into whole columns"""
+    with np.load(source, allow_pickle=False) as data:
+        parts: Dict[str, list] = {}
+        for key in sorted(k for k in data.files if "/" in k):
+            name = key.split("/", 1)[1]
+            parts.setdefault(name, []).append(data[key])
+    return {name: np.concatenate(arrays) for name, arrays in parts.items()}
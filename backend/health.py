@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Iterable, Optional
+
+STATUS_WARNING = 1
+STATUS_FAULT = 2
+
+def health_from_counts(fault_count: int, warning_count: int, total_count: int) -> dict:
+    """Score a window from its fault/warning counts"""
+    if not total_count:
+        return {"health_score": 0, "status": "unknown"}
+
+    health_score = 100
+    status = "healthy"
+
+    if fault_count > total_count * 0.1:  # More than 10% faults
+        health_score -= 50
+        status = "critical"
+    elif warning_count > total_count * 0.2:  # More than 20% warnings
+        health_score -= 30
+        status = "warning"
+
+    return {"health_score": max(0, health_score), "status": status}
+
+class HealthWindow:
+    """Fault/warning counters over a sliding window of readings
+
+    The window is bounded by count (size), by age (seconds), or both.
+    Each add() adjusts the counters for the reading entering and any
+    readings leaving, so updates are O(1) amortized.
+    """
+
+    __slots__ = ("size", "seconds", "readings", "fault_count", "warning_count", "last_ts")
+
+    def __init__(self, size: Optional[int] = None, seconds: Optional[float] = None):
+        self.size = size
+        self.seconds = seconds
+        self.readings = deque()  # (ts, status)
+        self.fault_count = 0
+        self.warning_count = 0
+        self.last_ts = None
+
+    def _count(self, status, delta: int):
+        if status == STATUS_FAULT:
+            self.fault_count += delta
+        elif status == STATUS_WARNING:
+            self.warning_count += delta
+
+    def _evict(self):
+        _, status = self.readings.popleft()
+        self._count(status, -1)
+
+    def add(self, status, ts: Optional[float] = None):
+        self.readings.append((ts, status))
+        self._count(status, 1)
+        if ts is not None:
+            self.last_ts = ts
+        if self.size is not None and len(self.readings) > self.size:
+            self._evict()
+        if self.seconds is not None and ts is not None:
+            self.expire(ts)
+
+    def expire(self, now: float):
+        """Drop readings older than the time window"""
+        if self.seconds is None:
+            return
+        cutoff = now - self.seconds
+        readings = self.readings
+        while readings and readings[0][0] is not None and readings[0][0] < cutoff:
+            self._evict()
+
+    def snapshot(self) -> dict:
+        result = health_from_counts(self.fault_count, self.warning_count, len(self.readings))
+        if self.readings:
+            updated = datetime.utcfromtimestamp(self.last_ts) if self.last_ts is not None else datetime.utcnow()
+            result["last_updated"] = updated.isoformat()
+        return result
+
+class HealthEngine:
+    """Incrementally maintained health scores for a fleet of devices"""
+
+    def __init__(self, window: Optional[int] = 100, window_seconds: Optional[float] = None):
+        if window is None and window_seconds is None:
+            raise ValueError("A count or time window is required")
+        self.window = window
+        self.window_seconds = window_seconds
+        self._windows: Dict[str, HealthWindow] = {}
+        self._lock = threading.Lock()
+
+    def update(self, device_id: str, status: int, ts: Optional[float] = None):
+        """Fold one reading into the device's window"""
+        if ts is None and self.window_seconds is not None:
+            ts = time.time()
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                window = self._windows[device_id] = HealthWindow(self.window, self.window_seconds)
+            window.add(status, ts)
+
+    def update_many(self, device_ids: Iterable[str], statuses: Iterable[int],
+                    timestamps: Optional[Iterable[float]] = None):
+        """Fold a batch of readings; timestamps default to now"""
+        if timestamps is None:
+            now = time.time() if self.window_seconds is not None else None
+            timestamps = repeat(now)
+        for device_id, status, ts in zip(device_ids, statuses, timestamps):
+            self.update(device_id, int(status), ts)
+
+    def score(self, device_id: str, now: Optional[float] = None) -> dict:
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                return health_from_counts(0, 0, 0)
+            window.expire(time.time() if now is None else now)
+            return window.snapshot()
+
+    def scores(self, now: Optional[float] = None) -> Dict[str, dict]:
+        """Current health for every device in one call"""
+        now = time.time() if now is None else now
+        with self._lock:
+            result = {}
+            for device_id, window in self._windows.items():
+                window.expire(now)
+                result[device_id] = window.snapshot()
+            return result
@@ -0,0 +1,139 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.simulator import METRICS, classify_status_array
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUED_READINGS = 200_000
+BATCH_SIZE = 5000
+MAX_WAIT = 0.25
+
+def validate_reading(reading, is_known: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+    """Return why a posted reading is unusable, or None if it is fine
+
+    is_known, when given, decides whether a device_id may be ingested, so
+    clients cannot create history for arbitrary devices.
+    """
+    if not isinstance(reading, dict):
+        return "reading must be an object"
+    if reading.get("device_id") in (None, ""):
+        return "missing field: device_id"
+    if is_known is not None and not is_known(str(reading["device_id"])):
+        return "unknown device_id"
+    for field in ("ts",) + METRICS:
+        value = reading.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return f"{field} must be a number"
+    return None
+
+def readings_to_columns(readings: Sequence[dict], default_ts: Optional[float] = None) -> Dict[str, object]:
+    """Convert reading dicts to columns, deriving the status code per row"""
+    default_ts = time.time() if default_ts is None else default_ts
+    n = len(readings)
+    columns = {
+        "device_id": [str(r["device_id"]) for r in readings],
+        "ts": np.fromiter((default_ts if r.get("ts") is None else r["ts"] for r in readings), dtype=np.float64, count=n),
+    }
+    for metric in METRICS:
+        columns[metric] = np.fromiter(
+            (np.nan if r.get(metric) is None else r[metric] for r in readings), dtype=np.float64, count=n)
+    # Missing temperature/CO2 compare as False, so they never raise the status
+    columns["status"] = classify_status_array(columns["temperature"], columns["co2_ppm"])
+    return columns
+
+class IngestQueue:
+    """Bounded reading queue drained by a background micro-batching worker
+
+    offer() is all-or-nothing: a request's readings are either queued in
+    full or refused, so callers can answer 429 and the client can retry the
+    same payload. The worker hands the handler batches of up to batch_size
+    readings, or whatever arrived within max_wait of the first one.
+    """
+
+    def __init__(self, handler: Callable[[List[dict]], None], max_readings: int = MAX_QUEUED_READINGS,
+                 batch_size: int = BATCH_SIZE, max_wait: float = MAX_WAIT):
+        self.handler = handler
+        self.max_readings = max_readings
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.depth = 0
+        self.processed = 0
+        self.rate = 0.0  # readings/s drained, smoothed
+        self._chunks = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="ingest-worker")
+                self._thread.start()
+
+    def offer(self, readings: List[dict]) -> bool:
+        if not readings:
+            return True
+        with self._cond:
+            if self.depth + len(readings) > self.max_readings:
+                return False
+            self._chunks.append(readings)
+            self.depth += len(readings)
+            self._cond.notify()
+            return True
+
+    def retry_after(self) -> int:
+        """Seconds until roughly half the queue should have drained"""
+        if self.rate <= 0:
+            return 1
+        return max(1, math.ceil(self.depth / 2 / self.rate))
+
+    def _take_batch(self) -> List[dict]:
+        with self._cond:
+            while not self._chunks:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while self.depth < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._chunks and len(batch) < self.batch_size:
+                chunk = self._chunks.popleft()
+                room = self.batch_size - len(batch)
+                if len(chunk) > room:
+                    self._chunks.appendleft(chunk[room:])
+                    chunk = chunk[:room]
+                batch.extend(chunk)
+            self.depth -= len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            started = time.monotonic()
+            try:
+                self.handler(batch)
+            except Exception:
+                logger.exception("Failed to process %d readings", len(batch))
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.processed += len(batch)
+            self.rate = 0.8 * self.rate + 0.2 * (len(batch) / elapsed) if self.rate else len(batch) / elapsed
+
+def split_valid(readings: Sequence, first_line: int = 0,
+                is_known: Optional[Callable[[str], bool]] = None) -> Tuple[List[dict], List[dict]]:
+    """Separate usable readings from rejected ones (with their position)"""
+    valid, rejected = [], []
+    for i, reading in enumerate(readings):
+        reason = validate_reading(reading, is_known)
+        if reason:
+            rejected.append({"index": first_line + i, "reason": reason})
+        else:
+            valid.append(reading)
+    return valid, rejected
@@ -0,0 +1,103 @@
+"""Minimal Modbus TCP server for local testing of the poller
+
+Serves function 0x03 (read holding registers) from an in-memory register
+map and counts the requests it receives. Run standalone with:
+    python -m backend.modbus_fake --port 5020
+"""
+import argparse
+import asyncio
+import struct
+from typing import Callable, Dict, Optional, Tuple, Union
+
+READ_HOLDING_REGISTERS = 0x03
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+
+RegisterValue = Union[int, Callable[[], int]]
+
+class FakeModbusServer:
+    """Answers read-holding-register requests for any unit id
+
+    registers maps (unit_id, address) to a value or a zero-argument callable;
+    unmapped addresses read as default (or raise an illegal-address
+    exception when default is None).
+    """
+
+    def __init__(self, registers: Optional[Dict[Tuple[int, int], RegisterValue]] = None,
+                 host: str = "127.0.0.1", port: int = 0, default: Optional[int] = 0, delay: float = 0.0):
+        self.registers = registers if registers is not None else {}
+        self.host = host
+        self.port = port
+        self.default = default
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self._server = None
+        self._writers = set()
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+    def _read(self, unit: int, address: int, count: int):
+        values = []
+        for offset in range(count):
+            value = self.registers.get((unit, address + offset), self.default)
+            if value is None:
+                return None
+            values.append((value() if callable(value) else value) & 0xFFFF)
+        return values
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                transaction, protocol, length, unit = struct.unpack(">HHHB", header)
+                pdu = await reader.readexactly(length - 1)
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                function = pdu[0]
+                if function != READ_HOLDING_REGISTERS:
+                    response = struct.pack(">BB", function | 0x80, ILLEGAL_FUNCTION)
+                else:
+                    address, count = struct.unpack(">HH", pdu[1:5])
+                    values = self._read(unit, address, count)
+                    if values is None:
+                        response = struct.pack(">BB", function | 0x80, ILLEGAL_DATA_ADDRESS)
+                    else:
+                        response = struct.pack(f">BB{count}H", function, count * 2, *values)
+                writer.write(struct.pack(">HHHB", transaction, protocol, len(response) + 1, unit) + response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass  # client went away or the loop is shutting down
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5020)
+    args = parser.parse_args()
+
+    async def serve():
+        server = FakeModbusServer(host=args.host, port=args.port, default=215)
+        await server.start()
+        print(f"Fake Modbus TCP server on {args.host}:{server.port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Multi-process telemetry pipeline sharded by device
+
+Each worker process owns the health windows, alert state and latest values
+for the devices that hash to its shard. Batches reach a worker through a
+small ring of preallocated shared-memory slots, so only slot numbers and
+newly seen device names are pickled. Workers publish compact per-device
+aggregates back to the parent, which is all the web process reads.
+"""
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.simulator import METRICS
+
+logger = logging.getLogger(__name__)
+
+SLOT_ROWS = 1 << 16
+SLOTS_PER_SHARD = 4
+PUBLISH_INTERVAL = 0.5
+SUBMIT_TIMEOUT = 5.0
+
+# Column layout of one shared-memory slot
+LAYOUT = (("ts", np.float64), ("device", np.int32)) + tuple((m, np.float64) for m in METRICS) + (("status", np.int8),)
+
+def shard_for(device_id: str, shards: int) -> int:
+    """Process-independent shard of a device (crc32, like stable_device_hash)"""
+    return zlib.crc32(str(device_id).encode("utf-8")) % shards
+
+def _slot_bytes(rows: int) -> int:
+    return sum(np.dtype(dtype).itemsize * rows for _, dtype in LAYOUT)
+
+def _slot_views(buf, rows: int) -> Dict[str, np.ndarray]:
+    """Column arrays laid end to end over a slot's buffer"""
+    views, offset = {}, 0
+    for name, dtype in LAYOUT:
+        views[name] = np.ndarray((rows,), dtype=dtype, buffer=buf, offset=offset)
+        offset += np.dtype(dtype).itemsize * rows
+    return views
+
+def _worker(shard: int, slot_names: Sequence[str], slot_rows: int, tasks, free, results,
+            window_seconds: float, publish_interval: float):
+    # Imported here so the parent does not pay for them when the pipeline is off
+    from backend.alerts import RuleEngine, default_rules
+    from backend.health import HealthEngine
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    views = [_slot_views(slot.buf, slot_rows) for slot in slots]
+    health = HealthEngine(window=None, window_seconds=window_seconds)
+    rules = RuleEngine(default_rules())
+    device_names: List[str] = []
+    latest: Dict[str, dict] = {}
+    dirty = set()
+    transitions = []
+    processed = 0
+    next_publish = time.monotonic() + publish_interval
+    rules_version = rules.version
+
+    while True:
+        try:
+            message = tasks.get(timeout=max(0.0, next_publish - time.monotonic()))
+        except queue.Empty:
+            message = ()
+        if message is None:
+            break
+        if message:
+            slot, rows, new_names = message
+            device_names.extend(new_names)
+            columns = {name: view[:rows].copy() for name, view in views[slot].items()}
+            free.put(slot)  # release the slot before the slow part
+
+            names = np.asarray(device_names, dtype=object)[columns["device"]]
+            batch = dict(columns, device_id=names.tolist())
+            health.update_many(batch["device_id"], columns["status"].tolist(), columns["ts"].tolist())
+            transitions.extend(rules.evaluate(batch))
+
+            # Latest reading per device: the last row of each device after a stable sort by time
+            order = np.lexsort((columns["ts"], columns["device"]))
+            codes = columns["device"][order]
+            last = order[np.append(codes[1:] != codes[:-1], True)]
+            for row in last.tolist():
+                device_id = names[row]
+                previous = latest.get(device_id)
+                if previous is not None and previous["ts"] > columns["ts"][row]:
+                    continue
+                values = {m: float(columns[m][row]) for m in METRICS if not np.isnan(columns[m][row])}
+                latest[device_id] = dict(values, ts=float(columns["ts"][row]), status=int(columns["status"][row]))
+                dirty.add(device_id)
+            processed += rows
+
+        if time.monotonic() >= next_publish:
+            now = time.time()
+            update = {"shard": shard, "processed": processed, "transitions": transitions,
+                      "devices": {d: dict(latest[d], health=health.score(d, now)) for d in dirty}}
+            if rules.version != rules_version:
+                rules_version = rules.version
+                update["active"] = rules.active()
+            results.put(update)
+            dirty, transitions = set(), []
+            next_publish = time.monotonic() + publish_interval
+
+    del views  # the views export the buffers, which must be released before close()
+    for slot in slots:
+        slot.close()
+
+class Pipeline:
+    """Parent-side dispatcher and aggregate store for the worker shards
+
+    submit() splits a columnar batch by shard and copies each part into a
+    free slot of that shard; it blocks (up to SUBMIT_TIMEOUT) when a shard
+    has no free slot, which is the pipeline's backpressure. A collector
+    thread merges worker updates, and on_update(devices, transitions) is
+    called with each shard's changes.
+    """
+
+    def __init__(self, workers: Optional[int] = None, slot_rows: int = SLOT_ROWS,
+                 slots_per_shard: int = SLOTS_PER_SHARD, window_seconds: float = 900,
+                 publish_interval: float = PUBLISH_INTERVAL,
+                 on_update: Optional[Callable[[Dict[str, dict], List[dict]], None]] = None):
+        self.workers = workers or mp.cpu_count()
+        self.slot_rows = slot_rows
+        self.slots_per_shard = slots_per_shard
+        self.window_seconds = window_seconds
+        self.publish_interval = publish_interval
+        self.on_update = on_update
+        self.version = 0  # advanced whenever the open alert set changes
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._devices: Dict[str, dict] = {}
+        self._active: Dict[int, List[dict]] = {}
+        self._processed: Dict[int, int] = {}
+        self._submitted = 0
+        self._shard_of: Dict[str, int] = {}
+        self._codes: List[Dict[str, int]] = []
+        self._processes = []
+        self._started = False
+
+    def start(self):
+        with self._submit_lock:
+            if not self._started:
+                self._start()
+
+    def _start(self):
+        # spawn: forking a threaded web server is unsafe
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._slots, self._views, self._tasks, self._free = [], [], [], []
+        for shard in range(self.workers):
+            slots = [shared_memory.SharedMemory(create=True, size=_slot_bytes(self.slot_rows))
+                     for _ in range(self.slots_per_shard)]
+            tasks, free = ctx.Queue(), ctx.Queue()
+            for i in range(self.slots_per_shard):
+                free.put(i)
+            process = ctx.Process(
+                target=_worker, name=f"pipeline-{shard}", daemon=True,
+                args=(shard, [s.name for s in slots], self.slot_rows, tasks, free, self._results,
+                      self.window_seconds, self.publish_interval))
+            process.start()
+            self._slots.append(slots)
+            self._views.append([_slot_views(s.buf, self.slot_rows) for s in slots])
+            self._tasks.append(tasks)
+            self._free.append(free)
+            self._codes.append({})
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect, daemon=True, name="pipeline-collector")
+        self._collector.start()
+        self._started = True
+
+    def submit(self, columns: Dict[str, Sequence]):
+        """Queue a columnar batch (device_id, ts, METRICS, status), starting the workers if needed"""
+        n = len(columns["ts"])
+        if not n:
+            return
+        unique, inverse = np.unique(np.asarray(columns["device_id"], dtype=str), return_inverse=True)
+        unique = unique.tolist()
+        with self._submit_lock:
+            if not self._started:
+                self._start()
+            for device_id in unique:
+                if device_id not in self._shard_of:
+                    self._shard_of[device_id] = shard_for(device_id, self.workers)
+            shards = np.array([self._shard_of[d] for d in unique], dtype=np.int64)[inverse]
+            arrays = {name: np.asarray(columns[name]) for name, _ in LAYOUT if name != "device"}
+            for shard in np.unique(shards).tolist():
+                rows = np.flatnonzero(shards == shard)
+                codes, new_names = self._encode(shard, unique, inverse[rows])
+                for lo in range(0, len(rows), self.slot_rows):
+                    part = rows[lo:lo + self.slot_rows]
+                    slot = self._free[shard].get(timeout=SUBMIT_TIMEOUT)
+                    views = self._views[shard][slot]
+                    for name, _ in LAYOUT:
+                        source = codes[lo:lo + self.slot_rows] if name == "device" else arrays[name][part]
+                        views[name][:len(part)] = source
+                    self._tasks[shard].put((slot, len(part), new_names))
+                    new_names = []
+            self._submitted += n
+
+    def _encode(self, shard: int, unique: List[str], unique_rows: np.ndarray):
+        """Per-shard device codes for the rows, plus names the worker has not seen"""
+        table = self._codes[shard]
+        new_names = []
+        present = np.unique(unique_rows)
+        mapping = np.empty(len(unique), dtype=np.int32)
+        for i in present.tolist():
+            name = unique[i]
+            code = table.get(name)
+            if code is None:
+                code = table[name] = len(table)
+                new_names.append(name)
+            mapping[i] = code
+        return mapping[unique_rows], new_names
+
+    def _collect(self):
+        while True:
+            try:
+                update = self._results.get()
+            except (EOFError, OSError):
+                return
+            shard = update["shard"]
+            with self._lock:
+                self._devices.update(update["devices"])
+                self._processed[shard] = update["processed"]
+                if "active" in update:
+                    # Alert ids are per worker; interleave them so they stay unique
+                    self._active[shard] = [dict(a, id=a["id"] * self.workers + shard) for a in update["active"]]
+                    self.version += 1
+            if self.on_update is not None and (update["devices"] or update["transitions"]):
+                try:
+                    self.on_update(update["devices"], update["transitions"])
+                except Exception:
+                    logger.exception("Pipeline update callback failed")
+
+    @property
+    def processed(self) -> int:
+        with self._lock:
+            return sum(self._processed.values())
+
+    @property
+    def submitted(self) -> int:
+        return self._submitted
+
+    def devices(self) -> Dict[str, dict]:
+        """Latest aggregated reading and health per device"""
+        with self._lock:
+            return {d: dict(v) for d, v in self._devices.items()}
+
+    def scores(self) -> Dict[str, dict]:
+        with self._lock:
+            return {d: v["health"] for d, v in self._devices.items()}
+
+    def active(self) -> List[dict]:
+        """Open alerts across all shards, oldest first"""
+        with self._lock:
+            alerts = [a for shard in self._active.values() for a in shard]
+        return sorted(alerts, key=lambda a: a["since"])
+
+    def wait(self, timeout: float = 30.0) -> bool:
+        """Block until every submitted reading has been published back"""
+        deadline = time.monotonic() + timeout
+        while self.processed < self._submitted:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self):
+        if not self._started:
+            return
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        self._views = []
+        for slots in self._slots:
+            for slot in slots:
+                slot.close()
+                slot.unlink()
+        self._started = False
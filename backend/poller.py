@@ -0,0 +1,354 @@
+"""Concurrent Modbus poller driven by a single asyncio event loop
+
+Run against a device CSV (see device_import) with:
+    python -m backend.poller devices.csv
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_REGISTERS_PER_READ = 125  # Modbus limit for function 0x03
+MAX_GAP = 8                   # unused registers we will read to merge two ranges
+CONNECTIONS_PER_GATEWAY = 2
+TIMEOUT = 2.0
+JITTER = 0.1                  # fraction of the interval
+FLUSH_INTERVAL = 0.5
+MIN_INTERVAL = 0.1            # seconds; shorter intervals would monopolise the loop
+
+# Optional polling columns of a device config: (type, minimum, maximum)
+POLL_FIELDS = {
+    "unit_id": (int, 0, 255),
+    "register": (int, 0, 65535),
+    "count": (int, 1, MAX_REGISTERS_PER_READ),
+    "interval": (float, MIN_INTERVAL, None),
+    "scale": (float, None, None),
+}
+
+def point_config_errors(config: dict) -> List[str]:
+    """Reasons the polling columns of a device config are unusable (empty if fine)"""
+    errors = []
+    values = {}
+    for field, (kind, low, high) in POLL_FIELDS.items():
+        value = config.get(field)
+        if value is None:
+            continue
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            values[field] = number = kind(value)
+        except (TypeError, ValueError):
+            errors.append(f"{field} is not {'an integer' if kind is int else 'a number'}: {value}")
+            continue
+        if number != number or number in (float("inf"), float("-inf")):
+            errors.append(f"{field} is not a finite number: {value}")
+        elif (low is not None and number < low) or (high is not None and number > high):
+            errors.append(f"{field} out of range: {value}")
+    if not errors and values.get("register", 0) + values.get("count", 1) > 65536:
+        errors.append("register range runs past 65535")
+    return errors
+
+class ModbusError(Exception):
+    """A Modbus exception response or malformed frame"""
+
+class ModbusConnection:
+    """One Modbus TCP connection issuing one request at a time"""
+
+    def __init__(self, host: str, port: int, timeout: float = TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._transactions = itertools.count(1)
+
+    async def open(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def read_holding_registers(self, unit: int, address: int, count: int) -> List[int]:
+        transaction = next(self._transactions) & 0xFFFF
+        pdu = struct.pack(">BHH", 0x03, address, count)
+        self._writer.write(struct.pack(">HHHB", transaction, 0, len(pdu) + 1, unit) + pdu)
+        await self._writer.drain()
+        header = await asyncio.wait_for(self._reader.readexactly(7), self.timeout)
+        got_transaction, _, length, _ = struct.unpack(">HHHB", header)
+        body = await asyncio.wait_for(self._reader.readexactly(length - 1), self.timeout)
+        if got_transaction != transaction:
+            raise ModbusError(f"transaction mismatch: sent {transaction}, got {got_transaction}")
+        if body[0] & 0x80:
+            raise ModbusError(f"exception code {body[1]} reading {address}+{count} from unit {unit}")
+        return list(struct.unpack(f">{body[1] // 2}H", body[2:2 + body[1]]))
+
+class ConnectionPool:
+    """Up to max_connections reusable connections to one gateway ip:port"""
+
+    def __init__(self, host: str, port: int, max_connections: int = CONNECTIONS_PER_GATEWAY,
+                 timeout: float = TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle: List[ModbusConnection] = []
+
+    async def read(self, unit: int, address: int, count: int) -> List[int]:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = ModbusConnection(self.host, self.port, self.timeout)
+                await connection.open()
+            try:
+                values = await connection.read_holding_registers(unit, address, count)
+            except BaseException:
+                connection.close()  # never reuse a connection in an unknown state
+                raise
+            self._idle.append(connection)
+            return values
+
+    def close(self):
+        for connection in self._idle:
+            connection.close()
+        self._idle.clear()
+
+class Point:
+    """One polled value: a register range on a device behind a gateway"""
+
+    __slots__ = ("device_id", "host", "port", "unit", "address", "count", "interval",
+                 "scale", "signed", "metric", "deadline")
+
+    def __init__(self, config: dict):
+        errors = point_config_errors(config)
+        if errors:
+            raise ValueError(f"Device {config.get('device_id')}: {'; '.join(errors)}")
+        self.device_id = str(config["device_id"])
+        self.host = config["ip"]
+        self.port = int(config["port"])
+        self.unit = int(config.get("unit_id", 1))
+        self.address = int(config.get("register", 0))
+        self.count = int(config.get("count", 1))
+        self.interval = float(config.get("interval", 1.0))
+        self.scale = float(config.get("scale", 1.0))
+        self.signed = str(config.get("signed", "")).lower() in ("1", "true", "yes")
+        self.metric = config.get("metric", "temperature")
+        self.deadline = 0.0
+
+    @property
+    def gateway(self) -> Tuple[str, int]:
+        return (self.host, self.port)
+
+    def decode(self, registers: List[int]) -> float:
+        raw = 0
+        for register in registers:  # big-endian word order
+            raw = (raw << 16) | register
+        bits = 16 * len(registers)
+        if self.signed and raw >= 1 << (bits - 1):
+            raw -= 1 << bits
+        return raw * self.scale
+
+class ReadGroup:
+    """Points on one gateway/unit/interval served by a single register read"""
+
+    __slots__ = ("gateway", "unit", "interval", "address", "count", "points", "deadline")
+
+    def __init__(self, gateway: Tuple[str, int], unit: int, interval: float,
+                 address: int, count: int, points: List[Point]):
+        self.gateway = gateway
+        self.unit = unit
+        self.interval = interval
+        self.address = address
+        self.count = count
+        self.points = points
+        self.deadline = 0.0
+
+def coalesce(points: Iterable[Point], max_gap: int = MAX_GAP,
+             max_registers: int = MAX_REGISTERS_PER_READ) -> List[ReadGroup]:
+    """Merge points into as few reads as the register layout allows
+
+    Points are grouped by gateway, unit and interval; within a group,
+    ranges closer than max_gap registers are read together as long as the
+    read stays within max_registers.
+    """
+    by_key = defaultdict(list)
+    for point in points:
+        by_key[(point.gateway, point.unit, point.interval)].append(point)
+    groups = []
+    for (gateway, unit, interval), members in by_key.items():
+        current = None
+        for point in sorted(members, key=lambda p: p.address):
+            end = point.address + point.count
+            if (current is not None and point.address <= current.address + current.count + max_gap
+                    and end - current.address <= max_registers):
+                current.count = max(current.count, end - current.address)
+                current.points.append(point)
+                continue
+            current = ReadGroup(gateway, unit, interval, point.address, point.count, [point])
+            groups.append(current)
+    return groups
+
+class Poller:
+    """Schedules register reads on an asyncio loop
+
+    Points are coalesced up front into read groups, each with its own
+    interval and a jittered deadline kept in a heap. Reads go through a
+    per-gateway connection pool that caps concurrent connections, so one
+    loop can poll thousands of points without a thread per device.
+    Readings are buffered and passed to sink in batches; a sink that
+    returns False (a full ingest queue) drops the batch, counted in
+    stats["dropped"].
+    """
+
+    def __init__(self, configs: Iterable[dict], sink: Callable[[List[dict]], None],
+                 connections_per_gateway: int = CONNECTIONS_PER_GATEWAY, timeout: float = TIMEOUT,
+                 jitter: float = JITTER, flush_interval: float = FLUSH_INTERVAL, seed: Optional[int] = None):
+        self.sink = sink
+        self.connections_per_gateway = connections_per_gateway
+        self.timeout = timeout
+        self.jitter = jitter
+        self.flush_interval = flush_interval
+        self.stats = defaultdict(int)
+        self._random = random.Random(seed)
+        points = []
+        for config in configs:
+            if config.get("protocol", "Modbus") != "Modbus":
+                # Only Modbus TCP has a driver; other protocols are counted, not polled
+                self.stats["unsupported"] += 1
+                continue
+            try:
+                points.append(Point(config))
+            except (KeyError, ValueError) as e:
+                logger.warning("Not polling %s: %s", config.get("device_id"), e)
+                self.stats["invalid"] += 1
+        self.groups = coalesce(points)
+        self.stats["points"] = len(points)
+        self._pools: Dict[Tuple[str, int], ConnectionPool] = {}
+        self._buffer: List[dict] = []
+        self._tasks = set()
+        self._loop = None
+        self._stopping = None
+
+    def _pool(self, gateway: Tuple[str, int]) -> ConnectionPool:
+        pool = self._pools.get(gateway)
+        if pool is None:
+            pool = self._pools[gateway] = ConnectionPool(*gateway, self.connections_per_gateway, self.timeout)
+        return pool
+
+    def _reschedule(self, group: ReadGroup, now: float) -> float:
+        jitter = self._random.uniform(-self.jitter, self.jitter) * group.interval
+        group.deadline += group.interval + jitter
+        if group.deadline < now:
+            # Fell behind: skip the missed polls rather than bursting
+            self.stats["skipped"] += 1
+            group.deadline = now + group.interval + jitter
+        return group.deadline
+
+    async def _read(self, group: ReadGroup):
+        try:
+            registers = await self._pool(group.gateway).read(group.unit, group.address, group.count)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ModbusError) as e:
+            self.stats["errors"] += 1
+            logger.debug("Read of %s:%s unit %s failed: %s", group.gateway[0], group.gateway[1], group.unit, e)
+            return
+        self.stats["reads"] += 1
+        ts = time.time()
+        for point in group.points:
+            offset = point.address - group.address
+            self._buffer.append({"device_id": point.device_id, "ts": ts,
+                                 point.metric: point.decode(registers[offset:offset + point.count])})
+
+    def _flush(self):
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            try:
+                accepted = self.sink(batch)
+            except Exception:
+                logger.exception("Poller sink failed for %d readings", len(batch))
+                accepted = False
+            if accepted is False:
+                self.stats["dropped"] += len(batch)
+
+    async def run(self):
+        loop = self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        now = time.monotonic()
+        heap = []
+        for seq, group in enumerate(self.groups):
+            # Spread first reads across one interval so gateways are not hit at once
+            group.deadline = now + self._random.uniform(0, group.interval)
+            heap.append((group.deadline, seq, group))
+        heapq.heapify(heap)
+        counter = itertools.count(len(heap))
+        next_flush = now + self.flush_interval
+
+        try:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                while heap and heap[0][0] <= now:
+                    _, _, group = heapq.heappop(heap)
+                    heapq.heappush(heap, (self._reschedule(group, now), next(counter), group))
+                    self.stats["polls"] += len(group.points)
+                    task = loop.create_task(self._read(group))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                if now >= next_flush:
+                    self._flush()
+                    next_flush = now + self.flush_interval
+                wake = min(heap[0][0] if heap else now + 1.0, next_flush)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), max(0.0, wake - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._flush()
+            for pool in self._pools.values():
+                pool.close()
+
+    def stop(self):
+        """Stop run(); safe to call from another thread"""
+        if self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+def start_in_thread(poller: Poller) -> threading.Thread:
+    """Run a poller on its own event loop in a daemon thread"""
+    thread = threading.Thread(target=asyncio.run, args=(poller.run(),), daemon=True, name="poller")
+    thread.start()
+    return thread
+
+def main():
+    from backend.device_import import import_devices
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("devices", help="device CSV with ip, port, unit_id, register, interval columns")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    received = []
+    poller = Poller(import_devices(args.devices)["accepted"], lambda batch: received.extend(batch))
+
+    async def run_for():
+        task = asyncio.create_task(poller.run())
+        await asyncio.sleep(args.seconds)
+        poller.stop()
+        await task
+
+    asyncio.run(run_for())
+    print(f"{len(received)} readings in {args.seconds:g}s, stats: {dict(poller.stats)}")
+
+if __name__ == "__main__":
+    main()
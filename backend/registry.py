@@ -0,0 +1,203 @@
+import bisect
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.summary import FleetSummary
+
+def parse_location(location: Optional[str]) -> Tuple[str, str]:
+    """Split "Building A - Floor 1" into ("A", "Floor 1")"""
+    if not location:
+        return "", ""
+    building, _, zone = location.partition(" - ")
+    building = building.strip()
+    if building.lower().startswith("building "):
+        building = building[len("building "):].strip()
+    return building, zone.strip()
+
+class DeviceRecord:
+    """Compact device record; fields outside __slots__ go in extra"""
+
+    __slots__ = ("id", "device_id", "name", "status", "protocol", "ip", "port",
+                 "location", "building", "temperature", "co2", "extra")
+
+    FIELDS = ("id", "device_id", "name", "status", "protocol", "ip", "port", "location", "temperature", "co2")
+    # Always serialized, even when None, to keep the /api/devices shape stable
+    CORE_FIELDS = ("id", "name", "status", "temperature", "co2", "location")
+
+    def __init__(self, data: dict):
+        for field in self.FIELDS:
+            setattr(self, field, data.get(field))
+        self.extra = {k: v for k, v in data.items() if k not in self.FIELDS}
+        self.building = parse_location(self.location)[0]
+
+    def summary_fields(self) -> tuple:
+        return (self.building, self.status, self.temperature, self.co2)
+
+    def to_dict(self) -> dict:
+        result = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None or field in self.CORE_FIELDS:
+                result[field] = value
+        result.update(self.extra)
+        return result
+
+class DeviceRegistry:
+    """Thread-safe device store with secondary indexes
+
+    Records are indexed by id and device_id for O(1) lookup, and by status,
+    protocol and building for filtered queries. Queries are paginated with
+    an opaque cursor (the last id returned) over id order. A FleetSummary
+    of counts and averages per building is kept current on every change.
+    """
+
+    INDEXED = ("status", "protocol", "building")
+
+    def __init__(self, devices: Iterable[dict] = ()):
+        self._lock = threading.RLock()
+        self._by_id: Dict[int, DeviceRecord] = {}
+        self._by_device_id: Dict[str, DeviceRecord] = {}
+        self._ordered_ids: List[int] = []
+        self._indexes = {name: defaultdict(set) for name in self.INDEXED}
+        self._summary = FleetSummary()
+        self._next_id = 1
+        self.version = 0  # advanced on every change, used for cache validation
+        for device in devices:
+            self.add(device)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _index(self, record: DeviceRecord):
+        for name in self.INDEXED:
+            self._indexes[name][getattr(record, name)].add(record.id)
+        if record.device_id is not None:
+            self._by_device_id[record.device_id] = record
+
+    def _unindex(self, record: DeviceRecord):
+        for name in self.INDEXED:
+            ids = self._indexes[name][getattr(record, name)]
+            ids.discard(record.id)
+            if not ids:
+                del self._indexes[name][getattr(record, name)]
+        if record.device_id is not None:
+            self._by_device_id.pop(record.device_id, None)
+
+    def add(self, data: dict) -> DeviceRecord:
+        """Insert a device, assigning the next id when none is given"""
+        with self._lock:
+            if data.get("id") is None:
+                data = dict(data, id=self._next_id)
+            record = DeviceRecord(data)
+            if record.id in self._by_id:
+                raise ValueError(f"Device id {record.id} already exists")
+            if record.device_id is not None and record.device_id in self._by_device_id:
+                raise ValueError(f"Device {record.device_id} already exists")
+            self._by_id[record.id] = record
+            bisect.insort(self._ordered_ids, record.id)
+            self._index(record)
+            self._summary.add(record.summary_fields())
+            self._next_id = max(self._next_id, record.id + 1)
+            self.version += 1
+            return record
+
+    def remove(self, device_id: int) -> Optional[dict]:
+        with self._lock:
+            record = self._by_id.pop(device_id, None)
+            if record is None:
+                return None
+            self._unindex(record)
+            self._summary.remove(record.summary_fields())
+            del self._ordered_ids[bisect.bisect_left(self._ordered_ids, device_id)]
+            self.version += 1
+            return record.to_dict()
+
+    def update(self, device_id: int, **fields) -> Optional[dict]:
+        """Apply field changes and return the previous values of changed fields"""
+        with self._lock:
+            record = self._by_id.get(device_id)
+            if record is None:
+                return None
+            previous = {}
+            for field, value in fields.items():
+                current = getattr(record, field) if field in DeviceRecord.FIELDS else record.extra.get(field)
+                if current != value:
+                    previous[field] = current
+            if not previous:
+                return previous
+            reindex = any(f in previous for f in ("status", "protocol", "location", "device_id"))
+            if reindex:
+                self._unindex(record)
+            before = record.summary_fields()
+            for field in previous:
+                if field in DeviceRecord.FIELDS:
+                    setattr(record, field, fields[field])
+                else:
+                    record.extra[field] = fields[field]
+            if "location" in previous:
+                record.building = parse_location(record.location)[0]
+            if reindex:
+                self._index(record)
+            self._summary.replace(before, record.summary_fields())
+            self.version += 1
+            return previous
+
+    def get(self, device_id: int) -> Optional[dict]:
+        with self._lock:
+            record = self._by_id.get(device_id)
+            return record.to_dict() if record else None
+
+    def get_by_device_id(self, device_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._by_device_id.get(device_id)
+            return record.to_dict() if record else None
+
+    def resolve(self, key) -> Optional[int]:
+        """Map a device_id, or an id given as text, to the record id"""
+        with self._lock:
+            record = self._by_device_id.get(key)
+            if record is None and str(key).isdigit():
+                record = self._by_id.get(int(key))
+            return record.id if record else None
+
+    def summary(self) -> dict:
+        """Fleet totals and per-building aggregates (see FleetSummary.snapshot)"""
+        with self._lock:
+            return self._summary.snapshot()
+
+    def building_of(self, device_id: int) -> Optional[str]:
+        with self._lock:
+            record = self._by_id.get(device_id)
+            return record.building if record else None
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            return list(self._ordered_ids)
+
+    def to_dicts(self) -> List[dict]:
+        with self._lock:
+            return [self._by_id[i].to_dict() for i in self._ordered_ids]
+
+    def query(self, status: Optional[str] = None, protocol: Optional[str] = None,
+              building: Optional[str] = None, limit: Optional[int] = None,
+              cursor: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+        """Return (devices, next_cursor) matching all given filters"""
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be a positive integer")
+        filters = {"status": status, "protocol": protocol, "building": building}
+        with self._lock:
+            candidates = [self._indexes[name].get(value, set())
+                          for name, value in filters.items() if value is not None]
+            if candidates:
+                candidates.sort(key=len)
+                matched = candidates[0].intersection(*candidates[1:])
+                ordered = sorted(matched)
+            else:
+                ordered = self._ordered_ids
+
+            start = bisect.bisect_right(ordered, cursor) if cursor is not None else 0
+            stop = len(ordered) if limit is None else min(len(ordered), start + limit)
+            page = [self._by_id[i].to_dict() for i in ordered[start:stop]]
+            next_cursor = ordered[stop - 1] if stop < len(ordered) and stop > start else None
+            return page, next_cursor
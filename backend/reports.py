@@ -0,0 +1,54 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Sequence
+
+CHUNK_SIZE = 64 * 1024
+
+def iter_report_csv(rows: Iterable[dict], start_date: datetime, end_date: datetime,
+                    headers: Optional[Sequence[str]] = None, chunk_size: int = CHUNK_SIZE,
+                    compress: bool = False) -> Iterator[bytes]:
+    """Stream a CSV report as bounded-size byte chunks
+
+    Rows are pulled lazily from any iterable and written through the csv
+    module, so memory stays flat no matter how many rows there are.
+    generate_report joins these chunks for callers that want one string.
+    With compress=True the chunks form a gzip stream.
+    """
+    rows = iter(rows)
+    if headers is None:
+        first = next(rows, None)
+        if first is not None:
+            headers = list(first.keys())
+            rows = chain([first], rows)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    buffer.write("Device Report\n")
+    buffer.write(f"Period: {start_date.strftime('%Y-%m-%d %H:%M')} to {end_date.strftime('%Y-%m-%d %H:%M')}\n")
+    buffer.write("\n")
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    if headers:
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow([row.get(h, "") for h in headers])
+            if buffer.tell() >= chunk_size:
+                chunk = drain()
+                if chunk:
+                    yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,69 @@
+"""Fast JSON encoding for the API
+
+FastJSONProvider uses orjson when it is installed and the stdlib encoder
+(compact, unsorted) otherwise. Both paths accept NumPy arrays and scalars.
+"""
+import json
+from typing import Optional
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Datetimes go through default() so both paths format them the way Flask does
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                  if orjson is not None else 0)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Compact JSON for API responses, produced directly as bytes
+
+    Keys are emitted in insertion order rather than sorted. orjson writes
+    NaN as null while the stdlib writes NaN, so float columns should go
+    through json_column() first.
+    """
+
+    use_orjson = orjson is not None
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return DefaultJSONProvider.default(o)
+
+    def dumps_bytes(self, obj) -> bytes:
+        if self.use_orjson:
+            return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+        return json.dumps(obj, default=self.default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:  # explicit encoder options: defer to the stdlib path
+            kwargs.setdefault("default", self.default)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+def json_column(values, decimals: Optional[int] = 3) -> list:
+    """A float array as a JSON-ready list: rounded, with NaN as None"""
+    values = np.asarray(values, dtype=np.float64)
+    if decimals is not None:
+        values = np.round(values, decimals)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    column = values.astype(object)
+    column[missing] = None
+    return column.tolist()
@@ -0,0 +1,82 @@
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from backend.utils import (
+    CO2_FAULT,
+    CO2_WARNING,
+    TEMP_FAULT,
+    TEMP_WARNING,
+    stable_device_hash,
+)
+
+METRICS = ("temperature", "co2_ppm", "humidity", "power_kw")
+
+SeedLike = Union[None, int, np.random.SeedSequence]
+
+def device_offsets(device_ids: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Return per-device temperature and CO2 offsets as arrays"""
+    hashes = np.fromiter((stable_device_hash(d) for d in device_ids), dtype=np.int64, count=len(device_ids))
+    return {
+        "temperature": (hashes % 10 - 5).astype(np.float64),  # -5 to +4
+        "co2_ppm": (hashes % 200 - 100).astype(np.float64),
+    }
+
+def classify_status_array(temperature: np.ndarray, co2_ppm: np.ndarray) -> np.ndarray:
+    """Vectorized classify_status: 0=OK, 1=WARNING, 2=FAULT"""
+    status = np.zeros(np.shape(temperature), dtype=np.int8)
+    status[(temperature > TEMP_WARNING) | (co2_ppm > CO2_WARNING)] = 1
+    status[(temperature > TEMP_FAULT) | (co2_ppm > CO2_FAULT)] = 2
+    return status
+
+class FleetSimulator:
+    """Batched, NumPy-backed counterpart of simulate_device_data
+
+    Every call to step() produces readings for all devices x ticks at once
+    as columnar arrays of shape (devices, ticks). The RNG stream is owned by
+    the simulator, so successive steps continue the same seeded sequence.
+    """
+
+    def __init__(self, device_ids: Sequence[str], seed: SeedLike = None):
+        self.device_ids = list(device_ids)
+        self._offsets = device_offsets(self.device_ids)
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self._rng = np.random.default_rng(seed)
+
+    def spawn(self, device_ids: Sequence[str], n: int = 1) -> list:
+        """Create independent simulators with child RNG streams"""
+        return [FleetSimulator(device_ids, seed=child) for child in self.seed_sequence.spawn(n)]
+
+    def step(self, ticks: int = 1) -> Dict[str, np.ndarray]:
+        """Generate one block of readings, shape (devices, ticks)"""
+        rng = self._rng
+        shape = (len(self.device_ids), ticks)
+
+        temperature = 25.0 + self._offsets["temperature"][:, None] + rng.uniform(-3, 8, shape)
+        co2_ppm = 400.0 + self._offsets["co2_ppm"][:, None] + rng.uniform(-50, 300, shape)
+        humidity = 50.0 + rng.uniform(-15, 25, shape)
+        power_kw = 5.0 + rng.uniform(-2, 3, shape)
+
+        # Occasionally generate alert conditions (same rates as the scalar version)
+        hot = rng.random(shape) < 0.05
+        temperature[hot] = rng.uniform(46, 55, int(hot.sum()))
+        high_co2 = rng.random(shape) < 0.03
+        co2_ppm[high_co2] = rng.uniform(1100, 1500, int(high_co2.sum()))
+
+        # Status comes from the unrounded values, as in simulate_device_data
+        return {
+            "temperature": np.round(temperature, 1),
+            "co2_ppm": np.round(co2_ppm, 0),
+            "humidity": np.round(humidity, 1),
+            "power_kw": np.round(power_kw, 2),
+            "status": classify_status_array(temperature, co2_ppm),
+        }
+
+def simulate_fleet_data(device_ids: Sequence[str], ticks: int = 1, seed: SeedLike = None,
+                        simulator: Optional[FleetSimulator] = None) -> Dict[str, np.ndarray]:
+    """Generate simulated telemetry for many devices and ticks in one call"""
+    if simulator is None:
+        simulator = FleetSimulator(device_ids, seed=seed)
+    return simulator.step(ticks)
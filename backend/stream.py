@@ -0,0 +1,127 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+def diff_records(previous: Dict, records: List[dict], key: str = "id") -> List[dict]:
+    """Return per-record deltas (key + changed fields) and update previous"""
+    deltas = []
+    for record in records:
+        record_key = record[key]
+        last = previous.get(record_key)
+        if last is None:
+            changed = dict(record)
+        else:
+            changed = {k: v for k, v in record.items() if last.get(k, _MISSING) != v}
+            if not changed:
+                continue
+            changed[key] = record_key
+        previous[record_key] = dict(record)
+        deltas.append(changed)
+    return deltas
+
+def format_event(event: str, data) -> bytes:
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+class Subscriber:
+    """Bounded frame queue for one streaming client
+
+    When a slow client falls max_frames behind, its queued deltas are
+    discarded and it is marked for resync: the next frame it receives is a
+    full snapshot, so it never applies deltas on top of a stale state.
+    """
+
+    def __init__(self, max_frames: int):
+        self.max_frames = max_frames
+        self.frames = deque()
+        self.cond = threading.Condition()
+        self.resync = True  # new clients start from a snapshot
+        self.dropped = 0
+
+    def put(self, frame: bytes):
+        with self.cond:
+            if len(self.frames) >= self.max_frames:
+                self.dropped += len(self.frames)
+                self.frames.clear()
+                self.resync = True
+            else:
+                self.frames.append(frame)
+            self.cond.notify()
+
+    def get(self, timeout: float) -> Optional[bytes]:
+        """Return the next frame, b"" when a resync is due, or None on timeout"""
+        with self.cond:
+            if not self.frames and not self.resync:
+                self.cond.wait(timeout)
+            if self.resync:
+                self.resync = False
+                self.frames.clear()
+                return b""
+            return self.frames.popleft() if self.frames else None
+
+class Broadcaster:
+    """Fan out pre-encoded frames from one producer to many subscribers"""
+
+    def __init__(self, snapshot: Callable[[], object], max_frames: int = 32, keepalive: float = 15.0):
+        self.snapshot = snapshot
+        self.max_frames = max_frames
+        self.keepalive = keepalive
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, data):
+        # Encode once, regardless of how many clients are listening
+        frame = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(frame)
+
+    def stream(self) -> Iterator[bytes]:
+        """Generator suitable for a text/event-stream Response"""
+        subscriber = Subscriber(self.max_frames)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        try:
+            while True:
+                frame = subscriber.get(self.keepalive)
+                if frame is None:
+                    yield b": keepalive\n\n"
+                elif frame == b"":
+                    yield format_event("snapshot", self.snapshot())
+                else:
+                    yield frame
+        finally:
+            with self._lock:
+                self._subscribers.remove(subscriber)
+
+class Producer(threading.Thread):
+    """Background thread that runs tick() on a fixed interval"""
+
+    def __init__(self, tick: Callable[[], None], interval: float):
+        super().__init__(daemon=True, name="telemetry-producer")
+        self.tick = tick
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Producer tick failed")
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop_event.set()
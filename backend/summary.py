@@ -0,0 +1,98 @@
+"""Running fleet aggregates for the dashboard overview
+
+FleetSummary keeps per-building device counts, counts by status and
+temperature/CO2 sums. It is updated with the before and after values of
+each changed device, so reading it costs O(buildings) no matter how many
+devices there are. It is not locked itself; DeviceRegistry updates and
+reads it under its own lock.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+# (building, status, temperature, co2) of one device
+Fields = Tuple[str, Optional[str], Optional[float], Optional[float]]
+
+def _number(value) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+class _Group:
+    __slots__ = ("devices", "statuses", "temperature_sum", "temperature_count", "co2_sum", "co2_count")
+
+    def __init__(self):
+        self.devices = 0
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.temperature_sum = 0.0
+        self.temperature_count = 0
+        self.co2_sum = 0.0
+        self.co2_count = 0
+
+    def apply(self, fields: Fields, sign: int):
+        _, status, temperature, co2 = fields
+        self.devices += sign
+        self.statuses[status or "unknown"] += sign
+        if not self.statuses[status or "unknown"]:
+            del self.statuses[status or "unknown"]
+        temperature, co2 = _number(temperature), _number(co2)
+        if temperature is not None:
+            self.temperature_sum += sign * temperature
+            self.temperature_count += sign
+        if co2 is not None:
+            self.co2_sum += sign * co2
+            self.co2_count += sign
+        # Sums drift slightly under repeated add/subtract; restart them when empty
+        if not self.temperature_count:
+            self.temperature_sum = 0.0
+        if not self.co2_count:
+            self.co2_sum = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "devices": self.devices,
+            "online": self.statuses.get("online", 0),
+            "statuses": dict(self.statuses),
+            "avg_temperature": (round(self.temperature_sum / self.temperature_count, 2)
+                                if self.temperature_count else None),
+            "avg_co2": round(self.co2_sum / self.co2_count, 1) if self.co2_count else None,
+        }
+
+class FleetSummary:
+    """Fleet-wide and per-building aggregates, maintained incrementally"""
+
+    def __init__(self):
+        self.total = _Group()
+        self.buildings: Dict[str, _Group] = {}
+
+    def add(self, fields: Fields):
+        self._apply(fields, 1)
+
+    def remove(self, fields: Fields):
+        self._apply(fields, -1)
+
+    def replace(self, before: Fields, after: Fields):
+        if before != after:
+            self._apply(before, -1)
+            self._apply(after, 1)
+
+    def _apply(self, fields: Fields, sign: int):
+        self.total.apply(fields, sign)
+        group = self.buildings.get(fields[0])
+        if group is None:
+            group = self.buildings[fields[0]] = _Group()
+        group.apply(fields, sign)
+        if not group.devices:
+            del self.buildings[fields[0]]
+
+    def snapshot(self) -> dict:
+        """{"total": {...}, "buildings": [{"building": ..., ...}, ...]} sorted by building"""
+        return {
+            "total": self.total.to_dict(),
+            "buildings": [dict(group.to_dict(), building=name)
+                          for name, group in sorted(self.buildings.items())],
+        }
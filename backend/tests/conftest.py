@@ -0,0 +1,5 @@
+import os
+import sys
+
+# CI runs pytest from backend/; the modules import each other as backend.*
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.alerts import Rule, RuleEngine, default_rules
+
+def mixed_rules():
+    return default_rules() + [
+        Rule("temp_sustained", "temperature", ">", 26.0, clear=24.0, for_seconds=5.0),
+        Rule("humidity_low", "humidity", "<", 30.0, clear=35.0, for_seconds=3.0),
+        Rule("humidity_scoped", "humidity", ">", 60.0, device_ids=["d1", "d3"]),
+        Rule("temp_rising", "temperature", ">", 0.5, clear=0.0, kind="rate"),
+    ]
+
+class ReferenceEngine:
+    """One reading at a time, straight from the Rule docstring"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.active = {}     # (device, rule_id) -> since
+        self.run_start = {}  # (device, rule_id) -> ts the current breach began
+        self.last = {}       # (device, metric) -> (ts, value) for rates
+
+    def evaluate(self, readings):
+        transitions = []
+        for reading in sorted(readings, key=lambda r: (r["device_id"], r["ts"])):
+            device, ts = reading["device_id"], reading["ts"]
+            rates = {}
+            for metric, value in reading.items():
+                if metric in ("device_id", "ts") or math.isnan(value):
+                    continue
+                previous = self.last.get((device, metric))
+                self.last[(device, metric)] = (ts, value)
+                if previous is not None and ts > previous[0]:
+                    rates[metric] = (value - previous[1]) / (ts - previous[0])
+            for rule in self.rules:
+                source = reading if rule.kind == "threshold" else rates
+                value = source.get(rule.metric, math.nan)
+                if math.isnan(value):
+                    continue
+                key = (device, rule.rule_id)
+                in_scope = rule.device_ids is None or device in rule.device_ids
+                signed, sign = (value, 1) if rule.op == ">" else (-value, -1)
+                breach = in_scope and signed > sign * rule.threshold
+                clear = not in_scope or signed <= sign * rule.clear
+                if breach:
+                    self.run_start.setdefault(key, ts)
+                else:
+                    self.run_start.pop(key, None)
+                triggered = breach and ts - self.run_start[key] >= rule.for_seconds
+                if triggered and key not in self.active:
+                    self.active[key] = ts
+                    transitions.append((device, rule.rule_id, "open", ts))
+                elif clear and not triggered and key in self.active:
+                    del self.active[key]
+                    transitions.append((device, rule.rule_id, "resolved", ts))
+        return transitions
+
+def random_batches(seed, batches, rows, devices=5):
+    rng = np.random.default_rng(seed)
+    clock = 0.0
+    for _ in range(batches):
+        ts = clock + rng.permutation(rows).astype(np.float64)
+        clock += rows
+        batch = {
+            "device_id": [f"d{i}" for i in rng.integers(0, devices, rows)],
+            "ts": ts,
+            # Noisy slow waves that keep crossing the rule thresholds
+            "temperature": 25.5 + 4 * np.sin(ts / 40.0) + rng.normal(0, 1.5, rows),
+            "co2_ppm": 900 + 350 * np.sin(ts / 55.0) + rng.normal(0, 60, rows),
+            "humidity": 45 + 25 * np.sin(ts / 30.0) + rng.normal(0, 4, rows),
+        }
+        for metric in ("temperature", "co2_ppm", "humidity"):
+            batch[metric][rng.random(rows) < 0.1] = np.nan
+        yield batch
+
+def as_readings(batch):
+    metrics = [k for k in batch if k not in ("device_id", "ts")]
+    return [dict({m: float(batch[m][i]) for m in metrics}, device_id=batch["device_id"][i], ts=float(batch["ts"][i]))
+            for i in range(len(batch["ts"]))]
+
+@pytest.mark.parametrize("seed, batches, rows, chunk_elements", [
+    (0, 20, 50, 4_000_000),
+    (1, 40, 7, 4_000_000),
+    (2, 3, 2500, 1),  # several 1024-row chunks per batch
+])
+def test_engine_matches_per_reading_reference(seed, batches, rows, chunk_elements):
+    rules = mixed_rules()
+    engine = RuleEngine(rules, chunk_elements=chunk_elements)
+    reference = ReferenceEngine(rules)
+    opened = 0
+    for batch in random_batches(seed, batches, rows):
+        expected = reference.evaluate(as_readings(batch))
+        got = [(t["device_id"], t["rule_id"], t["state"], t["ts"]) for t in engine.evaluate(batch)]
+        assert sorted(got) == sorted(expected)
+        assert sorted((a["device_id"], a["rule_id"], a["since"]) for a in engine.active()) == \
+            sorted((device, rule_id, since) for (device, rule_id), since in reference.active.items())
+        opened += sum(state == "open" for *_, state, _ in expected)
+    assert opened  # the data has to actually exercise the state machine
+
+def test_hysteresis_and_sustained_run_across_batches():
+    engine = RuleEngine([Rule("hot", "temperature", ">", 30.0, clear=28.0, for_seconds=10.0)])
+
+    def states(ts, values):
+        batch = {"device_id": ["a"] * len(ts), "ts": ts, "temperature": values}
+        return [(t["state"], t["ts"]) for t in engine.evaluate(batch)]
+
+    assert states([0, 5], [31, 32]) == []          # breaching, but not for 10 s yet
+    assert states([10], [31]) == [("open", 10)]    # run started in the previous batch
+    assert states([11, 12], [29, 35]) == []        # between clear and trigger: stays open
+    assert states([13], [28]) == [("resolved", 13)]
+    assert states([14, 20], [31, 31]) == []        # a fresh run restarts the timer
+    assert states([24], [31]) == [("open", 24)]
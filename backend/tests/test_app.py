@@ -0,0 +1,48 @@
+import csv
+import io
+import time
+
+import pytest
+
+import app as bms
+
+@pytest.fixture(scope="module")
+def client():
+    return bms.app.test_client()
+
+@pytest.fixture(scope="module")
+def auth(client):
+    token = client.post("/api/login", json={"email": "admin@voltas.com", "password": "admin123"}).get_json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def wait_for_ingest(processed, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while bms.ingest_queue.processed < processed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert bms.ingest_queue.processed >= processed
+
+def test_telemetry_reads_back_by_ingested_device_id(client, auth):
+    upload = "device_id,name,protocol,ip,port\nAHU-9,Air Handler 9,BACnet,10.9.0.9,47808\n"
+    assert client.post("/api/devices/import", data=upload, headers=auth).get_json()["accepted"] == 1
+    record_id = bms.registry.resolve("AHU-9")
+
+    processed = bms.ingest_queue.processed
+    reading = {"device_id": "AHU-9", "ts": time.time() - 60, "temperature": 21.5, "co2_ppm": 612}
+    assert client.post("/api/telemetry/batch", json=[reading], headers=auth).status_code == 202
+    wait_for_ingest(processed + 1)
+
+    by_device_id = client.get("/api/telemetry/AHU-9", headers=auth)
+    by_record_id = client.get(f"/api/telemetry/{record_id}", headers=auth)
+    assert by_device_id.status_code == 200
+    assert by_device_id.get_json()["points"] == by_record_id.get_json()["points"]
+    assert by_device_id.get_json()["points"][0]["temperature"] == 21.5
+
+    report = client.get("/api/reports/export?devices=AHU-9", headers=auth).get_data(as_text=True)
+    rows = list(csv.DictReader(io.StringIO(report.split("\n\n", 1)[1])))
+    assert [(r["device_id"], r["temperature"]) for r in rows] == [(str(record_id), "21.5")]
+
+def test_query_token_only_accepted_for_stream_and_downloads(client, auth):
+    token = auth["Authorization"].split(" ", 1)[1]
+    assert client.get(f"/api/alerts?token={token}").status_code == 401
+    assert client.get("/api/alerts", headers=auth).status_code == 200
+    assert client.get(f"/api/reports/export?token={token}").status_code == 200
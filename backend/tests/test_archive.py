@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from backend.archive import TelemetryArchive
+from backend.timeseries import TelemetryStore
+
+def append_readings(archive, start, count):
+    ts = start + np.arange(count, dtype=np.float64)
+    archive.append(ts, ["1"] * count, {"temperature": np.full(count, 21.0)})
+
+def test_reopen_seals_full_unsealed_segment(tmp_path):
+    archive = TelemetryArchive(str(tmp_path), segment_rows=8)
+    append_readings(archive, 1000, 8)
+    # Simulate a crash after the last row was written but before sealing
+    segment = archive._segments[-1]
+    if segment.sealed:
+        os.remove(segment.meta_path)
+        os.remove(os.path.join(segment.path, "index.i8"))
+
+    reopened = TelemetryArchive(str(tmp_path), segment_rows=8)
+    append_readings(reopened, 2000, 3)
+
+    rows = sum(len(batch["ts"]) for batch in reopened.scan(0, 10_000))
+    assert rows == 11
+    assert [s.sealed for s in reopened._segments] == [True, False]
+
+def test_append_spans_segments(tmp_path):
+    archive = TelemetryArchive(str(tmp_path), segment_rows=8)
+    append_readings(archive, 1000, 20)
+    assert [s.rows for s in archive._segments] == [8, 8, 4]
+    ts = np.concatenate([batch["ts"] for batch in archive.scan(0, 10_000)])
+    assert np.array_equal(ts, (1000 + np.arange(20)) * 1000)
+
+def test_iter_rows_matches_store_layout(tmp_path):
+    archive = TelemetryArchive(str(tmp_path), segment_rows=5)
+    store = TelemetryStore()
+    for device_id, ts, reading in [("1", 1000.0, {"temperature": 21.5, "co2_ppm": 600.0}),
+                                   ("2", 1000.0, {"temperature": 23.25}),
+                                   ("1", 1001.0, {"temperature": 21.75, "humidity": 40.0, "co2_ppm": 610.0})]:
+        store.append(device_id, ts, reading)
+        archive.append([ts], [device_id], {m: [v] for m, v in reading.items()})
+    expected = sorted(store.iter_rows(0, 2000), key=lambda r: (r["timestamp"], r["device_id"]))
+    assert list(archive.iter_rows(0, 2000)) == expected
+
+def test_metrics_outside_the_export_columns_are_skipped(tmp_path):
+    archive = TelemetryArchive(str(tmp_path))
+    archive.append([1000.0], ["1"], {"pressure": [101.3]})
+    archive.append([1001.0], ["1"], {"temperature": [21.5], "pressure": [101.2]})
+    rows = list(archive.iter_rows(0, 2000))
+    assert [(r["device_id"], r["temperature"]) for r in rows] == [("1", 21.5)]
+    assert "pressure" not in rows[0]
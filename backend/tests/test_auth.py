@@ -0,0 +1,68 @@
+import pytest
+
+from backend import auth
+from backend.auth import SessionStore, hash_password
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(auth.time, "time", lambda: now[0])
+    return now
+
+def make_store(**options):
+    users = {"a@example.com": {"role": "admin", "password_hash": hash_password("secret", iterations=1000)},
+             "b@example.com": {"role": "guest", "password_hash": hash_password("other", iterations=1000)}}
+    return SessionStore(users, **options)
+
+def test_login_checks_credentials():
+    store = make_store()
+    session = store.login("a@example.com", "secret")
+    assert session["role"] == "admin" and session["email"] == "a@example.com"
+    assert store.authenticate(session["token"])["email"] == "a@example.com"
+    assert store.login("a@example.com", "wrong") is None
+    assert store.login("nobody@example.com", "secret") is None
+    assert store.login(["a@example.com"], "secret") is None
+    assert store.login("a@example.com", None) is None
+    assert len(store) == 1
+
+def test_cached_tokens_skip_the_kdf_and_still_check_the_secret():
+    store = make_store(cache_size=1)
+    first = store.login("a@example.com", "secret")["token"]
+    second = store.login("b@example.com", "other")["token"]  # evicts the first from the cache
+
+    assert store.authenticate(first)["email"] == "a@example.com"
+    assert (store.hits, store.misses) == (0, 1)
+    assert store.authenticate(first)["email"] == "a@example.com"
+    assert (store.hits, store.misses) == (1, 1)
+
+    session_id = first.partition(".")[0]
+    assert store.authenticate(f"{session_id}.forged") is None
+    assert store.authenticate(second)["email"] == "b@example.com"  # verified again after eviction
+    assert store.authenticate(f"{second.partition('.')[0]}.forged") is None
+    assert store.authenticate("") is None and store.authenticate("no-secret") is None
+
+def test_revoke_invalidates_a_cached_token():
+    store = make_store()
+    token = store.login("a@example.com", "secret")["token"]
+    assert store.authenticate(token) is not None  # cached now
+    assert store.revoke(token) is True
+    assert store.authenticate(token) is None
+    assert store.revoke(token) is False
+
+def test_revoke_user_ends_all_their_sessions():
+    store = make_store()
+    tokens = [store.login("a@example.com", "secret")["token"] for _ in range(2)]
+    other = store.login("b@example.com", "other")["token"]
+    assert store.revoke_user("a@example.com") == 2
+    assert [store.authenticate(t) for t in tokens] == [None, None]
+    assert store.authenticate(other) is not None
+
+def test_sessions_expire(clock):
+    store = make_store(ttl=60)
+    token = store.login("a@example.com", "secret")["token"]
+    clock[0] += 59
+    assert store.authenticate(token) is not None
+    clock[0] += 2
+    assert store.authenticate(token) is None
+    store.login("b@example.com", "other")  # logging in prunes expired sessions
+    assert len(store) == 1
@@ -0,0 +1,33 @@
+import io
+
+from backend.device_import import import_devices
+
+HEADER = "device_id,name,protocol,ip,port,unit_id,register,count\n"
+
+def test_points_behind_one_gateway_are_kept_apart_by_register():
+    rows = ("T1,Temp,Modbus,10.0.0.5,502,1,10,1\n"
+            "H1,Humidity,Modbus,10.0.0.5,502,1,11,1\n"
+            "C1,CO2,Modbus,10.0.0.5,502,1,12,1\n")
+    result = import_devices(io.StringIO(HEADER + rows))
+    assert [d["device_id"] for d in result["accepted"]] == ["T1", "H1", "C1"]
+    assert result["rejected"] == []
+
+def test_same_register_range_is_still_a_duplicate():
+    rows = ("T1,Temp,Modbus,10.0.0.5,502,1,10,1\n"
+            "T2,Temp copy,Modbus,10.0.0.5,502,1,10,1\n")
+    existing = [{"device_id": "C1", "ip": "10.0.0.5", "port": 502, "unit_id": "1", "register": "12", "count": "1"}]
+    result = import_devices(io.StringIO(HEADER + rows + "C9,CO2,Modbus,10.0.0.5,502,1,12,1\n"), existing=existing)
+    assert [d["device_id"] for d in result["accepted"]] == ["T1"]
+    assert [(r["line"], r["reasons"]) for r in result["rejected"]] == [
+        (3, ["duplicate endpoint 10.0.0.5:502 register 10 (line 2)"]),
+        (4, ["duplicate endpoint 10.0.0.5:502 register 12 (already registered)"]),
+    ]
+
+def test_unpolled_devices_are_keyed_by_unit_id():
+    csv_text = ("device_id,name,protocol,ip,port,unit_id\n"
+                "A,A,BACnet,10.0.0.6,47808,1\n"
+                "B,B,BACnet,10.0.0.6,47808,2\n"
+                "C,C,BACnet,10.0.0.6,47808,2\n")
+    result = import_devices(io.StringIO(csv_text))
+    assert [d["device_id"] for d in result["accepted"]] == ["A", "B"]
+    assert result["rejected"][0]["reasons"] == ["duplicate endpoint 10.0.0.6:47808 (line 3)"]
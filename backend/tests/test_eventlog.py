@@ -0,0 +1,69 @@
+import time
+
+from backend.eventlog import EventLog
+
+def filled_log(n=250, **options):
+    log = EventLog(segment_events=16, **options)
+    now = time.time()
+    for i in range(n):
+        log.append("alert" if i % 3 else "login", f"dev{i % 4}", f"event {i}", ts=now - n + i)
+    return log
+
+def all_pages(log, limit, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page, cursor = log.query(limit=limit, cursor=cursor, **filters)
+        ids.extend(e["id"] for e in page)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+def test_cursor_pages_cover_every_event_once_newest_first():
+    log = filled_log()
+    ids, pages = all_pages(log, 100)
+    assert ids == list(range(250, 0, -1))
+    assert pages == 3
+    assert all_pages(log, 250) == (ids, 1)
+
+def test_cursor_pages_with_filters():
+    log = filled_log()
+    ids, _ = all_pages(log, 7, device="dev1", event_type="alert")
+    assert ids == [i + 1 for i in range(249, -1, -1) if i % 4 == 1 and i % 3]
+    assert log.query(device="nobody") == ([], None)
+
+def test_text_matches_word_prefixes_in_sealed_and_open_segments():
+    log = EventLog(segment_events=2)
+    for message in ("Temperature above 45", "temp sensor offline", "Contemporary art", "CO2 sensor offline",
+                    "Temp probe offline"):
+        log.append("alert", "dev", message)
+    assert log.segment_count() > 1 and not log._segments[-1].sealed
+
+    def messages(text):
+        return [e["message"] for e in log.query(text=text)[0]]
+
+    assert messages("temp") == ["Temp probe offline", "temp sensor offline", "Temperature above 45"]
+    assert messages("TEMP off") == ["Temp probe offline", "temp sensor offline"]
+    assert messages("sens") == ["CO2 sensor offline", "temp sensor offline"]
+    assert messages("porary") == []
+
+def test_quiet_log_ages_out_without_appends():
+    log = EventLog(max_age=60)
+    log.append("login", "System", "old", ts=time.time() - 120)
+    assert log.segment_count() == 1 and not log._segments[0].sealed
+    version = log.version
+    assert log.query() == ([], None)
+    assert len(log) == 0 and log.dropped == 1 and log.version > version
+
+    log.append("login", "System", "new")
+    assert [e["message"] for e in log.query()[0]] == ["new"]
+    assert log.expire() == 0
+
+def test_expire_drops_aged_segments_and_keeps_recent_ones():
+    log = EventLog(segment_events=2, max_age=60)
+    now = time.time()
+    for i in range(5):
+        log.append("alert", "dev", f"event {i}", ts=now + i)
+    assert log.segment_count() == 3
+    assert log.expire(now + 62.5) == 2  # only the first segment is wholly older than the cutoff
+    assert [e["message"] for e in log.query()[0]] == ["event 4", "event 3", "event 2"]
+    assert log.expire(now + 70) == 3 and log.segment_count() == 0
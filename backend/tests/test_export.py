@@ -0,0 +1,24 @@
+import io
+import zipfile
+
+import pytest
+
+from backend.export import iter_export, write_export
+
+def test_empty_npz_export_is_a_valid_archive():
+    body = write_export([], "npz", {"title": "Device Report"})
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.namelist() == ["report.json"]
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_empty_arrow_exports_are_valid_files(fmt):
+    pa = pytest.importorskip("pyarrow")
+    body = b"".join(iter_export(iter([]), fmt, {"title": "Device Report"}))
+    if fmt == "arrow":
+        table = pa.ipc.open_stream(body).read_all()
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(io.BytesIO(body))
+    assert table.num_rows == 0
+    assert table.column_names[:2] == ["ts", "device_id"] and "status" in table.column_names
+    assert table.schema.metadata[b"title"] == b"Device Report"
@@ -0,0 +1,72 @@
+import pytest
+
+from backend.health import HealthEngine, HealthWindow
+from backend.utils import calculate_device_health
+
+@pytest.mark.parametrize("statuses, expected", [
+    ([2, 2, 0, 0, 0, 0, 0, 0, 0, 0], ("critical", 50)),
+    ([2, 0, 0, 0, 0, 0, 0, 0, 0, 0], ("healthy", 100)),
+    ([1, 1, 1, None, 0, 0, 0, 0, 0, 0], ("warning", 70)),
+    ([1, 1, 0, 0, 0, 0, 0, 0, 0, 0], ("healthy", 100)),
+])
+def test_calculate_device_health(statuses, expected):
+    telemetry = [{} if s is None else {"status": s} for s in statuses]
+    result = calculate_device_health(telemetry)
+    assert (result["status"], result["health_score"]) == expected
+    assert "last_updated" in result
+
+def test_calculate_device_health_empty():
+    assert calculate_device_health([]) == {"health_score": 0, "status": "unknown"}
+
+def test_count_window_evicts_oldest_readings():
+    window = HealthWindow(size=3)
+    for status in (2, 1, 0):
+        window.add(status)
+    assert (window.fault_count, window.warning_count) == (1, 1)
+    window.add(0)
+    assert (window.fault_count, window.warning_count, len(window.readings)) == (0, 1, 3)
+    window.add(0)
+    assert (window.fault_count, window.warning_count) == (0, 0)
+
+def test_time_window_evicts_readings_older_than_seconds():
+    window = HealthWindow(seconds=10)
+    window.add(2, ts=0)
+    window.add(1, ts=5)
+    window.add(0, ts=10)  # exactly at the cutoff: the ts=0 reading stays
+    assert (window.fault_count, window.warning_count) == (1, 1)
+    window.add(0, ts=11)
+    assert (window.fault_count, window.warning_count, len(window.readings)) == (0, 1, 3)
+    window.expire(16)
+    assert (window.warning_count, len(window.readings)) == (0, 2)
+    window.expire(100)
+    assert window.snapshot() == {"health_score": 0, "status": "unknown"}
+
+def test_window_bounded_by_count_and_age():
+    window = HealthWindow(size=2, seconds=10)
+    for ts, status in enumerate((2, 2, 1)):
+        window.add(status, ts=ts)
+    assert (window.fault_count, window.warning_count) == (1, 1)
+    window.add(0, ts=20)
+    assert (window.fault_count, window.warning_count, len(window.readings)) == (0, 0, 1)
+
+def test_engine_scores_with_time_window():
+    engine = HealthEngine(window=None, window_seconds=60)
+    engine.update_many(["a", "a", "b"], [2, 0, 1], [0, 30, 30])
+    scores = engine.scores(now=30)
+    assert {d: s["status"] for d, s in scores.items()} == {"a": "critical", "b": "warning"}
+    assert scores["a"]["last_updated"] == "1970-01-01T00:00:30"
+
+    assert {d: s["status"] for d, s in engine.scores(now=70).items()} == {"a": "healthy", "b": "warning"}
+    assert engine.score("a", now=100) == {"health_score": 0, "status": "unknown"}
+    assert engine.score("missing") == {"health_score": 0, "status": "unknown"}
+
+def test_engine_scores_with_count_window():
+    engine = HealthEngine(window=2)
+    engine.update_many(["a"] * 3, [2, 2, 0])
+    assert engine.score("a")["status"] == "critical"
+    engine.update("a", 0)
+    assert engine.score("a")["status"] == "healthy"
+
+def test_engine_needs_a_window():
+    with pytest.raises(ValueError):
+        HealthEngine(window=None, window_seconds=None)
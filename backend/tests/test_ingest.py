@@ -0,0 +1,13 @@
+from backend.ingest import split_valid
+
+def test_split_valid_rejects_unknown_devices():
+    readings = [{"device_id": "1", "temperature": 21.0}, {"device_id": "AHU-9", "temperature": 60},
+                {"temperature": 20.0}]
+    valid, rejected = split_valid(readings, is_known=lambda device_id: device_id == "1")
+    assert valid == readings[:1]
+    assert rejected == [{"index": 1, "reason": "unknown device_id"},
+                        {"index": 2, "reason": "missing field: device_id"}]
+
+def test_split_valid_without_registry_accepts_any_device():
+    valid, rejected = split_valid([{"device_id": "AHU-9"}])
+    assert len(valid) == 1 and not rejected
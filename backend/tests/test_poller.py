@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from backend.modbus_fake import FakeModbusServer
+from backend.poller import ModbusConnection, ModbusError, Point, Poller, coalesce, point_config_errors
+
+def point(device_id, register, count=1, interval=1.0, unit_id=1, **extra):
+    return dict({"device_id": device_id, "ip": "127.0.0.1", "port": 502, "unit_id": unit_id,
+                 "register": register, "count": count, "interval": interval}, **extra)
+
+def poll(configs, registers, seconds=0.35, sink=None, **server_options):
+    """Run a poller against a fake server; returns (readings, poller, server)"""
+    readings = []
+    sink = sink or readings.extend
+
+    async def scenario():
+        server = FakeModbusServer(registers, **server_options)
+        port = await server.start()
+        poller = Poller([dict(c, port=port) for c in configs], sink, flush_interval=0.05, seed=1)
+        task = asyncio.create_task(poller.run())
+        await asyncio.sleep(seconds)
+        poller.stop()
+        await asyncio.wait_for(task, 2)
+        await server.stop()
+        return poller, server
+
+    poller, server = asyncio.run(scenario())
+    return readings, poller, server
+
+def test_coalesce_merges_nearby_registers_only():
+    points = [Point(point("a", 100)), Point(point("b", 102, count=2)), Point(point("c", 200)),
+              Point(point("d", 101, interval=5.0)), Point(point("e", 100, unit_id=2))]
+    groups = sorted(coalesce(points), key=lambda g: (g.unit, g.interval, g.address))
+    assert [(g.unit, g.address, g.count, sorted(p.device_id for p in g.points)) for g in groups] == [
+        (1, 100, 4, ["a", "b"]),
+        (1, 200, 1, ["c"]),
+        (1, 101, 1, ["d"]),
+        (2, 100, 1, ["e"]),
+    ]
+
+def test_coalesce_respects_read_limit():
+    points = [Point(point(str(i), i * 100, count=100)) for i in range(3)]
+    assert len(coalesce(points)) == 3
+
+def test_point_decode_signed_scaled_and_multiword():
+    assert Point(point("a", 0, signed="true", scale=0.1)).decode([0xFFF6]) == pytest.approx(-1.0)
+    assert Point(point("a", 0, count=2)).decode([0x0001, 0x0002]) == 0x00010002
+
+def test_poller_reads_decoded_values_with_one_request_per_group():
+    registers = {(1, 10): 215, (1, 11): 0xFFF6, (1, 12): 450}
+    configs = [point("t", 10, interval=0.1, scale=0.1, metric="temperature"),
+               point("h", 11, interval=0.1, signed="1", metric="humidity"),
+               point("c", 12, interval=0.1, metric="co2_ppm")]
+    readings, poller, server = poll(configs, registers)
+
+    assert poller.stats["reads"] >= 2
+    assert server.requests == poller.stats["reads"]  # the three points share one read
+    latest = {}
+    for reading in readings:
+        latest.update({k: v for k, v in reading.items() if k not in ("device_id", "ts")})
+    assert latest == {"temperature": pytest.approx(21.5), "humidity": -10, "co2_ppm": 450}
+
+def test_poller_counts_exception_responses_as_errors():
+    readings, poller, server = poll([point("x", 10, interval=0.1)], {}, default=None)
+    assert readings == []
+    assert poller.stats["errors"] >= 1 and poller.stats["reads"] == 0
+
+def test_poller_counts_readings_refused_by_the_sink():
+    refused = []
+
+    def full_queue(batch):
+        refused.extend(batch)
+        return False
+
+    _, poller, _ = poll([point("x", 10, interval=0.1)], {(1, 10): 7}, sink=full_queue)
+    assert refused and poller.stats["dropped"] == len(refused)
+
+def test_poller_skips_invalid_points_without_hanging():
+    configs = [point("bad", 10, interval=0), point("worse", "abc"), point("ok", 10, interval=0.1)]
+    readings, poller, _ = poll(configs, {(1, 10): 7})
+    assert poller.stats["invalid"] == 2 and poller.stats["points"] == 1
+    assert readings and all(r["device_id"] == "ok" for r in readings)
+
+def test_connection_raises_modbus_error_for_illegal_address():
+    async def scenario():
+        server = FakeModbusServer({}, default=None)
+        port = await server.start()
+        connection = ModbusConnection("127.0.0.1", port, 1.0)
+        try:
+            await connection.open()
+            with pytest.raises(ModbusError):
+                await connection.read_holding_registers(1, 0, 1)
+        finally:
+            connection.close()
+            await server.stop()
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("field, value", [("interval", "0"), ("interval", "-1"), ("register", "abc"),
+                                          ("count", "126"), ("unit_id", "300"), ("scale", "nan")])
+def test_point_config_errors_rejects_bad_poll_columns(field, value):
+    assert point_config_errors({field: value})
+    with pytest.raises(ValueError):
+        Point(dict(point("a", 0), **{field: value}))
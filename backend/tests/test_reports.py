@@ -0,0 +1,33 @@
+import csv
+import gzip
+import io
+from datetime import datetime
+
+from backend.reports import iter_report_csv
+from backend.utils import generate_report
+
+START, END = datetime(2024, 1, 1), datetime(2024, 1, 2)
+
+def parse(text):
+    preamble, body = text.split("\n\n", 1)
+    return preamble.splitlines(), list(csv.reader(io.StringIO(body)))
+
+def test_values_with_delimiters_are_quoted():
+    rows = [{"device_id": "x,y", "name": 'Unit "A"', "note": "two\nlines"}]
+    text = b"".join(iter_report_csv(rows, START, END)).decode()
+    preamble, table = parse(text)
+    assert preamble == ["Device Report", "Period: 2024-01-01 00:00 to 2024-01-02 00:00"]
+    assert table == [["device_id", "name", "note"], ["x,y", 'Unit "A"', "two\nlines"]]
+
+def test_chunks_are_bounded_and_gzip_round_trips():
+    rows = [{"device_id": str(i), "temperature": 21.5} for i in range(5000)]
+    chunks = list(iter_report_csv(rows, START, END, chunk_size=1024))
+    assert len(chunks) > 1 and max(len(c) for c in chunks) < 2048
+    compressed = b"".join(iter_report_csv(rows, START, END, compress=True))
+    assert gzip.decompress(compressed) == b"".join(chunks)
+
+def test_generate_report_csv_uses_the_streaming_writer():
+    rows = [{"device_id": "x,y", "temperature": 21.5}, {"device_id": "2"}]
+    text = generate_report(rows, START, END)
+    assert text == b"".join(iter_report_csv(rows, START, END)).decode()
+    assert parse(text)[1] == [["device_id", "temperature"], ["x,y", "21.5"], ["2", ""]]
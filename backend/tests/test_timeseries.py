@@ -0,0 +1,37 @@
+import numpy as np
+
+from backend.timeseries import INITIAL_ROWS, TelemetryStore
+
+def test_rings_grow_on_demand():
+    store = TelemetryStore()
+    store.append("1", 1000.0, {"temperature": 21.0})
+    series = store._series("1")
+    assert len(series.raw.ts) == INITIAL_ROWS
+    assert all(len(ring.ts) <= INITIAL_ROWS for ring in series.rollups.values())
+
+def test_raw_ring_matches_reference_across_growth_and_wrap():
+    rng = np.random.default_rng(0)
+    store = TelemetryStore(raw_capacity=500)
+    reference = []
+    ts = 1000.0
+    for _ in range(60):
+        n = int(rng.integers(1, 40))
+        times = ts + np.arange(n)
+        values = rng.normal(22, 1, n).astype(np.float32)
+        ts += n
+        store.extend("1", times, {"temperature": values})
+        reference.extend(zip(times.tolist(), values.tolist()))
+        reference = reference[-500:]
+
+        result = store.query("1", 0, ts, resolution="raw")
+        assert result["ts"].tolist() == [t for t, _ in reference]
+        assert result["temperature"].tolist() == [v for _, v in reference]
+    assert len(store._series("1").raw.ts) == 500
+
+def test_empty_batches_are_ignored():
+    store = TelemetryStore()
+    store.extend("1", [], {})
+    assert store.query("1", 0, 2000) is None
+    store.append("1", 1000.0, {"temperature": 21.0})
+    store._series("1").extend(np.empty(0), np.empty((0, len(store.metrics)), dtype=np.float32))
+    assert store.query("1", 0, 2000, resolution="raw")["temperature"].tolist() == [21.0]
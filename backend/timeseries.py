@@ -0,0 +1,272 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from backend.simulator import METRICS
+
+# Rollup resolutions in seconds and how many buckets each one keeps
+RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600}
+ROLLUP_CAPACITY = {"1m": 8 * 1440, "15m": 35 * 96, "1h": 90 * 24}
+RAW_CAPACITY = 6 * 3600
+INITIAL_ROWS = 64  # rings start this small and double up to their capacity
+
+class _Ring:
+    """Fixed-capacity ring of time-ordered rows stored as parallel arrays
+
+    The arrays start at INITIAL_ROWS and double as rows arrive, so a device
+    with little history does not hold a full-capacity buffer. The ring only
+    wraps once the arrays have reached capacity.
+    """
+
+    def __init__(self, capacity: int, columns: Dict[str, tuple]):
+        self.capacity = capacity
+        self.columns = columns
+        self.ts, self.cols = self._allocate(min(capacity, INITIAL_ROWS))
+        self.head = 0  # next physical write position
+        self.size = 0
+
+    def _allocate(self, rows: int):
+        return np.zeros(rows, dtype=np.float64), {
+            name: np.full((rows,) + shape, fill, dtype=dtype) for name, (dtype, shape, fill) in self.columns.items()}
+
+    def _grow(self, rows: int):
+        allocated = len(self.ts)
+        while allocated < rows:
+            allocated *= 2
+        ts, cols = self._allocate(min(allocated, self.capacity))
+        ts[:self.size] = self.ts[:self.size]
+        for name, values in self.cols.items():
+            cols[name][:self.size] = values[:self.size]
+        self.ts, self.cols = ts, cols
+
+    def append(self, ts: np.ndarray, cols: Dict[str, np.ndarray]):
+        n = len(ts)
+        if n == 0:
+            return
+        if n > self.capacity:
+            ts = ts[-self.capacity:]
+            cols = {k: v[-self.capacity:] for k, v in cols.items()}
+            n = self.capacity
+        if self.size + n > len(self.ts) and len(self.ts) < self.capacity:
+            self._grow(self.size + n)
+        stop = self.head + n
+        idx = slice(self.head, stop) if stop <= self.capacity else (self.head + np.arange(n)) % self.capacity
+        self.ts[idx] = ts
+        for name, values in cols.items():
+            self.cols[name][idx] = values
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def last_index(self) -> Optional[int]:
+        return (self.head - 1) % self.capacity if self.size else None
+
+    def _segments(self) -> List[tuple]:
+        """Physical (start, stop) slices in logical (oldest first) order"""
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        if self.head == 0:
+            return [(0, self.capacity)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def oldest(self) -> Optional[float]:
+        return float(self.ts[self._segments()[0][0]]) if self.size else None
+
+    def range(self, start: float, end: float) -> Dict[str, np.ndarray]:
+        """Copy out rows with start <= ts <= end using binary search"""
+        parts = []
+        for a, b in self._segments():
+            ts = self.ts[a:b]
+            lo = a + int(np.searchsorted(ts, start, side="left"))
+            hi = a + int(np.searchsorted(ts, end, side="right"))
+            if hi > lo:
+                parts.append((lo, hi))
+        out = {"ts": np.concatenate([self.ts[lo:hi] for lo, hi in parts]) if parts
+               else np.empty(0, dtype=np.float64)}
+        for name, arr in self.cols.items():
+            out[name] = (np.concatenate([arr[lo:hi] for lo, hi in parts]) if parts
+                         else np.empty((0,) + arr.shape[1:], dtype=arr.dtype))
+        return out
+
+class _DeviceSeries:
+    """Raw ring buffer plus min/max/sum/count rollups for one device"""
+
+    def __init__(self, n_metrics: int, raw_capacity: int, rollup_capacity: Dict[str, int]):
+        self.lock = threading.Lock()
+        self.last_ts = -np.inf
+        self.dropped = 0
+        self.raw = _Ring(raw_capacity, {"values": (np.float32, (n_metrics,), np.nan)})
+        self.rollups = {
+            name: _Ring(rollup_capacity[name], {
+                "min": (np.float32, (n_metrics,), np.inf),
+                "max": (np.float32, (n_metrics,), -np.inf),
+                "sum": (np.float64, (n_metrics,), 0.0),
+                "count": (np.int32, (n_metrics,), 0),
+            })
+            for name in RESOLUTIONS
+        }
+
+    def extend(self, ts: np.ndarray, values: np.ndarray):
+        if len(ts) == 0:
+            return
+        if len(ts) > 1 and (ts[1:] < ts[:-1]).any():
+            order = np.argsort(ts, kind="stable")
+            ts, values = ts[order], values[order]
+        # Rings are kept time-ordered so queries can binary search;
+        # readings older than what is already stored are dropped
+        if ts[0] < self.last_ts:
+            keep = ts >= self.last_ts
+            self.dropped += int((~keep).sum())
+            ts, values = ts[keep], values[keep]
+        if len(ts) == 0:
+            return
+        self.last_ts = float(ts[-1])
+        self.raw.append(ts, {"values": values})
+
+        valid = ~np.isnan(values)
+        as64 = values.astype(np.float64)
+        filled = {
+            "min": np.where(valid, as64, np.inf),
+            "max": np.where(valid, as64, -np.inf),
+            "sum": np.where(valid, as64, 0.0),
+            "count": valid.astype(np.int32),
+        }
+        reducers = {"min": np.fmin, "max": np.fmax, "sum": np.add, "count": np.add}
+        for name, seconds in RESOLUTIONS.items():
+            first_bucket = (ts[0] // seconds) * seconds
+            if ts[-1] < first_bucket + seconds:
+                # Common case: the whole batch falls into a single bucket
+                bucket_ts = np.array([first_bucket])
+                agg = {k: reducers[k].reduce(v, axis=0, keepdims=True) for k, v in filled.items()}
+            else:
+                buckets = (ts // seconds) * seconds
+                starts = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+                bucket_ts = buckets[starts]
+                agg = {k: reducers[k].reduceat(v, starts, axis=0) for k, v in filled.items()}
+            ring = self.rollups[name]
+            last = ring.last_index()
+            if last is not None and ring.ts[last] == bucket_ts[0]:
+                # Fold the first new bucket into the still-open last bucket
+                cols = ring.cols
+                cols["min"][last] = np.fmin(cols["min"][last], agg["min"][0])
+                cols["max"][last] = np.fmax(cols["max"][last], agg["max"][0])
+                cols["sum"][last] += agg["sum"][0]
+                cols["count"][last] += agg["count"][0]
+                if len(bucket_ts) == 1:
+                    continue
+                bucket_ts = bucket_ts[1:]
+                agg = {k: v[1:] for k, v in agg.items()}
+            ring.append(bucket_ts, agg)
+
+class TelemetryStore:
+    """In-process, array-backed telemetry history with downsampled rollups
+
+    Each device keeps a ring buffer of raw readings (one float32 column per
+    metric) and 1-min/15-min/1-h rollup rings holding min/max/sum/count per
+    bucket. Rollups are updated on write, so range queries over long periods
+    read a few thousand precomputed buckets instead of rescanning raw points.
+    """
+
+    def __init__(self, metrics: Sequence[str] = METRICS, raw_capacity: int = RAW_CAPACITY,
+                 rollup_capacity: Optional[Dict[str, int]] = None):
+        self.metrics = tuple(metrics)
+        self._metric_index = {m: i for i, m in enumerate(self.metrics)}
+        self.raw_capacity = raw_capacity
+        self.rollup_capacity = dict(ROLLUP_CAPACITY, **(rollup_capacity or {}))
+        self._devices: Dict[str, _DeviceSeries] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, device_id: str, create: bool = False) -> Optional[_DeviceSeries]:
+        series = self._devices.get(device_id)
+        if series is None and create:
+            with self._lock:
+                series = self._devices.get(device_id)
+                if series is None:
+                    series = _DeviceSeries(len(self.metrics), self.raw_capacity, self.rollup_capacity)
+                    self._devices[device_id] = series
+        return series
+
+    def device_ids(self) -> List[str]:
+        return list(self._devices)
+
+    def append(self, device_id: str, ts: float, readings: Dict[str, float]):
+        """Record a single reading; unknown metrics are ignored"""
+        self.extend(device_id, [ts], {k: [v] for k, v in readings.items()})
+
+    def extend(self, device_id: str, ts: Iterable[float], columns: Dict[str, Iterable[float]]):
+        """Record a batch of readings for one device given as columns"""
+        ts = np.asarray(ts, dtype=np.float64)
+        if len(ts) == 0:
+            return
+        values = np.full((len(ts), len(self.metrics)), np.nan, dtype=np.float32)
+        for metric, column in columns.items():
+            i = self._metric_index.get(metric)
+            if i is not None:
+                values[:, i] = np.asarray(column, dtype=np.float32)
+        series = self._series(str(device_id), create=True)
+        with series.lock:
+            series.extend(ts, values)
+
+    def query(self, device_id: str, start: float, end: float, resolution: str = "auto",
+              metrics: Optional[Sequence[str]] = None) -> Optional[dict]:
+        """Return columnar readings for start <= ts <= end
+
+        Raw results map each metric to a value array; rollup results map each
+        metric to {"min", "max", "mean"} arrays. Returns None for unknown devices.
+        """
+        series = self._series(str(device_id))
+        if series is None:
+            return None
+        if resolution == "auto":
+            resolution = pick_resolution(end - start)
+        if resolution != "raw" and resolution not in RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+        metrics = list(metrics or self.metrics)
+        columns = [self._metric_index[m] for m in metrics]
+
+        with series.lock:
+            ring = series.raw if resolution == "raw" else series.rollups[resolution]
+            rows = ring.range(start, end)
+
+        result = {"resolution": resolution, "ts": rows["ts"]}
+        if resolution == "raw":
+            for metric, i in zip(metrics, columns):
+                result[metric] = rows["values"][:, i]
+            return result
+        counts = rows["count"]
+        empty = counts == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = rows["sum"] / counts
+        for metric, i in zip(metrics, columns):
+            result[metric] = {
+                "min": np.where(empty[:, i], np.nan, rows["min"][:, i]),
+                "max": np.where(empty[:, i], np.nan, rows["max"][:, i]),
+                "mean": mean[:, i],
+            }
+        return result
+
+    def iter_rows(self, start: float, end: float,
+                  device_ids: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Yield raw readings as row dicts, one device at a time"""
+        for device_id in device_ids or self.device_ids():
+            result = self.query(device_id, start, end, resolution="raw")
+            if result is None:
+                continue
+            columns = [(m, result[m]) for m in self.metrics]
+            for i, ts in enumerate(result["ts"]):
+                row = {"timestamp": datetime.fromtimestamp(ts).isoformat(), "device_id": device_id}
+                for metric, values in columns:
+                    value = float(values[i])
+                    row[metric] = "" if np.isnan(value) else round(value, 3)
+                yield row
+
+def pick_resolution(span_seconds: float) -> str:
+    """Choose the coarsest resolution that still gives a useful chart"""
+    if span_seconds <= 2 * 3600:
+        return "raw"
+    if span_seconds <= 2 * 86400:
+        return "1m"
+    if span_seconds <= 14 * 86400:
+        return "15m"
+    return "1h"
@@ -1,8 +1,35 @@
 import random
 import json
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, Union
 import io
+import zlib
+
+from backend.health import health_from_counts
+from backend.metrics import timed
+from backend.poller import point_config_errors
+from backend.reports import iter_report_csv
+
+# Status thresholds shared by the scalar and batched simulators
+TEMP_WARNING = 45.0
+TEMP_FAULT = 50.0
+CO2_WARNING = 1000.0
+CO2_FAULT = 1300.0
+
+def stable_device_hash(device_id: str) -> int:
+    """Return a process-independent hash of a device ID (0-99)"""
+    # Built-in hash() is salted per process, so offsets would change on restart
+    return zlib.crc32(str(device_id).encode("utf-8")) % 100
+
+def classify_status(temperature: float, co2_ppm: float) -> int:
+    """Map a reading to a status code (0=OK, 1=WARNING, 2=FAULT)"""
+    status = 0
+    if temperature > TEMP_WARNING or co2_ppm > CO2_WARNING:
+        status = 1
+    if temperature > TEMP_FAULT or co2_ppm > CO2_FAULT:
+        status = 2
+    return status
 
 def simulate_device_data(device_id: str) -> Dict[str, float]:
     """Generate simulated telemetry data for a device"""
@@ -14,7 +41,7 @@ def simulate_device_data(device_id: str) -> Dict[str, float]:
     base_power = 5.0
     
     # Add some variation based on device ID for consistency
-    device_hash = hash(device_id) % 100
+    device_hash = stable_device_hash(device_id)
     temp_offset = (device_hash % 10) - 5  # -5 to +5
     co2_offset = (device_hash % 200) - 100  # -100 to +100
     
@@ -32,11 +59,7 @@ def simulate_device_data(device_id: str) -> Dict[str, float]:
         co2_ppm = random.uniform(1100, 1500)  # High CO2
     
     # Status code (0=OK, 1=WARNING, 2=FAULT)
-    status = 0
-    if temperature > 45 or co2_ppm > 1000:
-        status = 1
-    if temperature > 50 or co2_ppm > 1300:
-        status = 2
+    status = classify_status(temperature, co2_ppm)
     
     return {
         "temperature": round(temperature, 1),
@@ -46,49 +69,57 @@ def simulate_device_data(device_id: str) -> Dict[str, float]:
         "status": status
     }
 
-def generate_report(device_data: list, start_date: datetime, end_date: datetime, format: str = "csv") -> str:
-    """Generate a simple CSV report"""
+@timed()
+def generate_report(device_data: list, start_date: datetime, end_date: datetime,
+                    format: str = "csv") -> Union[str, bytes]:
+    """Generate a report: CSV text, or npz/arrow/parquet bytes
+
+    The binary formats hold typed columns (see backend.export); arrow and
+    parquet fall back to npz when pyarrow is not installed.
+    """
     
     if format.lower() == "csv":
-        # Generate simple CSV report
-        csv_lines = []
-        csv_lines.append("Device Report")
-        csv_lines.append(f"Period: {start_date.strftime('%Y-%m-%d %H:%M')} to {end_date.strftime('%Y-%m-%d %H:%M')}")
-        csv_lines.append("")
-        
-        if device_data:
-            # Add headers
-            if device_data:
-                headers = list(device_data[0].keys())
-                csv_lines.append(",".join(headers))
-                
-                # Add data rows
-                for row in device_data:
-                    csv_lines.append(",".join(str(row.get(h, "")) for h in headers))
-        
-        return "\n".join(csv_lines)
+        # Same writer as the streamed export, so values are quoted consistently
+        return b"".join(iter_report_csv(device_data, start_date, end_date)).decode("utf-8")
+
+    elif format.lower() in ("npz", "arrow", "parquet"):
+        # Imported here: backend.export imports the simulator, which imports this module
+        from backend.export import rows_to_batch, write_export
+        batches = [rows_to_batch(device_data)] if device_data else []
+        metadata = {"title": "Device Report", "start": start_date.isoformat(), "end": end_date.isoformat()}
+        return write_export(batches, format.lower(), metadata)
     
     else:
         return "Report format not supported"
 
-def validate_device_config(config: dict) -> bool:
-    """Validate device configuration"""
-    required_fields = ['device_id', 'name', 'protocol', 'ip', 'port']
-    
-    for field in required_fields:
-        if field not in config:
-            return False
-    
+REQUIRED_DEVICE_FIELDS = ['device_id', 'name', 'protocol', 'ip', 'port']
+SUPPORTED_PROTOCOLS = ['Modbus', 'BACnet']
+
+def device_config_errors(config: dict) -> list:
+    """Return the reasons a device configuration is invalid (empty if valid)"""
+    errors = [f"missing field: {field}" for field in REQUIRED_DEVICE_FIELDS if field not in config]
+
     # Validate protocol
-    if config['protocol'] not in ['Modbus', 'BACnet']:
-        return False
-    
+    if 'protocol' in config and config['protocol'] not in SUPPORTED_PROTOCOLS:
+        errors.append(f"unsupported protocol: {config['protocol']}")
+
     # Validate port range
-    if not (1 <= config['port'] <= 65535):
-        return False
-    
-    return True
+    if 'port' in config:
+        port = config['port']
+        if not isinstance(port, int) or isinstance(port, bool):
+            errors.append(f"port is not an integer: {port}")
+        elif not (1 <= port <= 65535):
+            errors.append(f"port out of range: {port}")
+
+    # Optional polling columns (unit_id, register, count, interval, scale)
+    errors.extend(point_config_errors(config))
+    return errors
+
+def validate_device_config(config: dict) -> bool:
+    """Validate device configuration"""
+    return not device_config_errors(config)
 
+@timed()
 def parse_csv_devices(csv_content: str) -> list:
     """Parse CSV content and return list of device dictionaries"""
     try:
@@ -121,39 +152,13 @@ def parse_csv_devices(csv_content: str) -> list:
     except Exception as e:
         raise ValueError(f"Error parsing CSV: {str(e)}")
 
+@timed()
 def calculate_device_health(telemetry_data: list) -> dict:
     """Calculate device health metrics from telemetry data"""
     if not telemetry_data:
         return {"health_score": 0, "status": "unknown"}
-    
-    # Simple health calculation
-    health_score = 100
-    status = "healthy"
-    
-    # Check for alert conditions in recent data
-    fault_count = sum(1 for d in telemetry_data if d.get('status') == 2)
-    warning_count = sum(1 for d in telemetry_data if d.get('status') == 1)
-    
-    total_count = len(telemetry_data)
-    
-    if fault_count > total_count * 0.1:  # More than 10% faults
-        health_score -= 50
-        status = "critical"
-    elif warning_count > total_count * 0.2:  # More than 20% warnings
-        health_score -= 30
-        status = "warning"
-    
-    health_score = max(0, health_score)
-    
-    return {
-        "health_score": health_score,
-        "status": status,
-        "last_updated": datetime.utcnow().isoformat()
-    }
-
-
-
-
-
 
-    
\ No newline at end of file
+    counts = Counter(d.get('status') for d in telemetry_data)
+    result = health_from_counts(counts[2], counts[1], len(telemetry_data))
+    result["last_updated"] = datetime.utcnow().isoformat()
+    return result